@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build every locale's catalog from i18n_categorized.json in one pass
+
+The source catalog is loaded and flattened once; its unique strings are
+translated per locale through the shared translation memory, so a string
+that appears under several keys is translated once and strings translated
+in an earlier run (or imported) cost nothing. Adding a locale to LOCALES
+only costs that locale's new translations.
+
+Per-locale translation:
+  rules   - phrase dictionary from translate_with_ai.py (Korean -> English)
+  memory  - translation memory only; strings without an entry keep the source text
+  stub / http - batched MT backend (see mt_backend.py) for memory misses
+
+--hashed instead publishes content-hashed copies of the deployed catalogs
+(the files i18n-loader.js fetches, i18n_output.LOCALE_CATALOGS) for every
+locale, with a manifest and optional deltas. Run it as the last step, once
+the translated catalogs are in place.
+"""
+
+import json
+import time
+from pathlib import Path
+
+from i18n_output import LOCALE_CATALOGS, PRODUCTION_DIR_NAME, ArtifactWriter, write_hashed_catalogs
+from mt_backend import BatchTranslator, IncompleteTranslation, make_backend
+from translate_with_ai import RULES_VERSION, is_korean, translate_korean_to_english
+from translation_memory import DEFAULT_MEMORY_PATH, TranslationMemory, collect_strings
+
+SOURCE_CATALOG = 'i18n_categorized.json'
+OUTPUT_DIR = 'i18n_build'
+
+# locale -> how to translate it, and an optional hand-maintained catalog
+# that is imported into the translation memory before building
+LOCALES = {
+    'en': {'translate': 'rules'},
+    'zh-TW': {'translate': 'memory', 'seed': 'i18n_categorized_zh-tw.json'},
+}
+
+
+def output_name(locale):
+    return f"i18n_categorized_{locale.lower()}.json"
+
+
+def build_trees(obj, tables):
+    """Walk the source once, returning one translated copy per translation table"""
+    if isinstance(obj, dict):
+        trees = [{} for _ in tables]
+        for key, value in obj.items():
+            for tree, child in zip(trees, build_trees(value, tables)):
+                tree[key] = child
+        return trees
+    elif isinstance(obj, list):
+        trees = [[] for _ in tables]
+        for item in obj:
+            for tree, child in zip(trees, build_trees(item, tables)):
+                tree.append(child)
+        return trees
+    elif isinstance(obj, str):
+        return [table.get(obj, obj) for table in tables]
+    else:
+        return [obj] * len(tables)
+
+
+def translate_locale(memory, locale, config, unique, backend=None, endpoint=None, source_locale='ko'):
+    """Translation table {source: target} for one locale, plus run statistics"""
+    method = backend if backend and config['translate'] != 'rules' else config['translate']
+    before = (memory.hits, memory.misses)
+    translator = None
+
+    if method == 'rules':
+        korean = [text for text in unique if is_korean(text)]
+        table = memory.translate_all(korean, translate_korean_to_english, locale, RULES_VERSION)
+    elif method == 'memory':
+        table = memory.get_many(unique, locale)
+        memory.hits += len(table)
+    else:
+        translator = BatchTranslator(make_backend(method, endpoint), source_locale, locale)
+        table = memory.translate_all(unique, None, locale, f"mt:{method}:{endpoint or ''}",
+                                     translator.translate_many, 'mt')
+
+    stats = {
+        'method': method,
+        'hits': memory.hits - before[0],
+        'translated': memory.misses - before[1],
+        'untranslated': len(unique) - len(table),
+        'mt': translator.summary() if translator else None,
+    }
+    return table, stats
+
+
+def publish_hashed(out_dir, locales, delta=False):
+    """Hash the deployed catalog of every locale into out_dir; returns the manifest"""
+    catalogs = {}
+    for locale in locales:
+        file_name = LOCALE_CATALOGS[locale]
+        with open(file_name, 'r', encoding='utf-8') as f:
+            catalogs[file_name] = json.load(f)
+        korean = sum(1 for text in collect_strings(catalogs[file_name].get('strings', {}), []) if is_korean(text))
+        if korean:
+            print(f"⚠️  {file_name}: {korean} values still contain Korean")
+
+    writer = ArtifactWriter()
+    manifest = write_hashed_catalogs(out_dir, catalogs, delta=delta, writer=writer, compress=True)
+    print(f"🔒 Hashed catalogs in {out_dir}:")
+    for file_name in catalogs:
+        entry = manifest['catalogs'][file_name]
+        print(f"   {file_name:32} -> {entry['file']}")
+        for old_version, delta_file in entry['deltas'].items():
+            print(f"   {'delta from ' + old_version:32} -> {delta_file}")
+    return manifest
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build all locale catalogs from the source catalog in one pass')
+    parser.add_argument('--source', default=SOURCE_CATALOG, help='Source catalog')
+    parser.add_argument('--out-dir', default=OUTPUT_DIR, help='Directory for the built catalogs')
+    parser.add_argument('--locales', help=f"Comma-separated subset of: {', '.join(LOCALES)}")
+    parser.add_argument('--memory', default=str(DEFAULT_MEMORY_PATH),
+                        help='Translation memory file (see translation_memory.py)')
+    parser.add_argument('--no-seed', action='store_true',
+                        help='Do not import hand-maintained locale catalogs into the memory first')
+    parser.add_argument('--backend', choices=['stub', 'http'],
+                        help='MT backend for strings the memory cannot answer (non-rules locales)')
+    parser.add_argument('--endpoint', help='URL of the MT service for --backend http')
+    parser.add_argument('--hashed', action='store_true',
+                        help='Do not build; publish content-hashed copies of the deployed catalogs '
+                             f"({', '.join(LOCALE_CATALOGS.values())}) and their manifest")
+    parser.add_argument('--delta', action='store_true',
+                        help='With --hashed, also write a delta from each catalog\'s previous version')
+    parser.add_argument('--hashed-dir', default=PRODUCTION_DIR_NAME,
+                        help=f"Directory for hashed catalogs (default: {PRODUCTION_DIR_NAME})")
+    args = parser.parse_args()
+
+    locales = args.locales.split(',') if args.locales else list(LOCALES)
+    unknown = [locale for locale in locales if locale not in LOCALES]
+    if unknown:
+        parser.error(f"unknown locale(s): {', '.join(unknown)}")
+
+    if args.hashed:
+        publish_hashed(args.hashed_dir, locales, args.delta)
+        return
+
+    start = time.perf_counter()
+    print(f"📖 Loading {args.source}...")
+    with open(args.source, 'r', encoding='utf-8') as f:
+        source = json.load(f)
+    strings = source.get('strings', {})
+
+    # Flatten once; every locale works on the same deduplicated strings
+    leaves = collect_strings(strings, [])
+    unique = list(dict.fromkeys(leaves))
+    print(f"   {len(leaves)} strings, {len(unique)} unique")
+
+    tables = []
+    with TranslationMemory(args.memory) as memory:
+        for locale in locales:
+            config = LOCALES[locale]
+            seed = config.get('seed')
+            if seed and not args.no_seed and Path(seed).exists():
+                with open(seed, 'r', encoding='utf-8') as f:
+                    memory.seed_from_catalogs(source, json.load(f), locale)
+
+            try:
+                table, stats = translate_locale(memory, locale, config, unique, args.backend, args.endpoint)
+            except IncompleteTranslation as e:
+                print(f"❌ {locale}: machine translation failed: {e}")
+                print(f"   {len(e.translations)} translations of completed batches saved to the memory; "
+                      f"nothing written, rerun to translate the rest")
+                raise SystemExit(1)
+            tables.append(table)
+            print(f"🌐 {locale:6} {stats['method']:7} {stats['hits']:5} from memory, "
+                  f"{stats['translated']:5} translated, {stats['untranslated']:5} kept as source")
+            if stats['mt']:
+                print(f"   {stats['mt']}")
+
+    # One walk over the source emits every locale
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for locale, tree in zip(locales, build_trees(strings, tables)):
+        catalog = {'metadata': {**source.get('metadata', {}), 'locale': locale}, 'strings': tree}
+        output_file = out_dir / output_name(locale)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=2)
+        print(f"📁 {output_file}")
+
+    print(f"✅ Built {len(locales)} locale(s) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
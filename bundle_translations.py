@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Split the translation catalogs into per-page bundles from actual key usage
+
+Every page is scanned for the keys its data-i18n* attributes reference.
+Keys used on at least --common-threshold of the pages (navigation, footer,
+search...) go into one common bundle that browsers cache once; the rest of
+each page's keys go into a page bundle. Pages that use the same keys (same
+template) share a bundle. For each locale this writes
+
+    i18n_bundles/<locale dir>/common.json
+    i18n_bundles/<locale dir>/page-<hash>.json
+
+in the catalog's {"strings": {category: {key: value}}} shape, plus
+i18n_bundles/manifest.json mapping each page to its bundle; i18n-loader.js
+uses the manifest and falls back to the full catalog for unknown pages.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import html as html_lib
+from pathlib import Path
+
+from prerender_locales import LOCALES, find_pages
+
+BUNDLE_DIR = 'i18n_bundles'
+MANIFEST_FILE_NAME = 'manifest.json'
+COMMON_BUNDLE = 'common'
+DEFAULT_COMMON_THRESHOLD = 0.5
+
+# data-i18n="key" and data-i18n-{placeholder,title,alt,aria}="key"
+_KEY_ATTR_RE = re.compile(r'''\sdata-i18n(?:-[a-z]+)?\s*=\s*(?:"([^"]*)"|'([^']*)')''')
+
+
+def page_keys(file_path):
+    """Catalog keys referenced by a page"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return {html_lib.unescape(double or single) for double, single in _KEY_ATTR_RE.findall(content)}
+
+
+def lookup(strings, key):
+    """Value of a dotted key in a nested catalog, or None"""
+    value = strings
+    for part in key.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value if isinstance(value, str) else None
+
+
+def make_bundle(strings, keys):
+    """Nested {"strings": ...} bundle holding only the given keys"""
+    bundle = {}
+    for key in sorted(keys):
+        value = lookup(strings, key)
+        if value is None:
+            continue
+        *path, last = key.split('.')
+        node = bundle
+        for part in path:
+            node = node.setdefault(part, {})
+        node[last] = value
+    return {'strings': bundle}
+
+
+def dump_compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def bundle_id(keys):
+    """Stable bundle name for a key set"""
+    digest = hashlib.sha1('\n'.join(sorted(keys)).encode('utf-8')).hexdigest()
+    return f"page-{digest[:10]}"
+
+
+def write_if_changed(path, data):
+    """Write bytes unless the file already has them; returns True if written"""
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
+
+
+def print_size_report(report, locales):
+    """Bytes shipped per page with the full catalog vs manifest + common + page bundle"""
+    print(f"\n📊 Bytes per page (full catalog -> manifest + common + page bundle):")
+    for locale in locales:
+        rows = report[locale]
+        if not rows:
+            print(f"  {locale}: no pages")
+            continue
+        before = sum(row[1] for row in rows)
+        after = sum(row[2] for row in rows)
+        print(f"  {locale}: {before / len(rows) / 1024:.1f} KB -> {after / len(rows) / 1024:.1f} KB per page "
+              f"on average ({100 - after * 100 / max(before, 1):.0f}% less, "
+              f"{before / 1024:.0f} KB -> {after / 1024:.0f} KB over {len(rows)} pages)")
+        for page, page_before, page_after in sorted(rows, key=lambda row: -row[2])[:5]:
+            print(f"    {page_before / 1024:7.1f} KB -> {page_after / 1024:6.1f} KB  {page}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build per-page translation bundles from key usage')
+    parser.add_argument('--root', default=str(Path(__file__).parent), help='Mirror root directory')
+    parser.add_argument('--out', help=f"Bundle directory (default: <root>/{BUNDLE_DIR})")
+    parser.add_argument('--catalog', action='append', default=[], metavar='LOCALE=PATH',
+                        help='Use another catalog for a locale (e.g. from build_translations.py)')
+    parser.add_argument('--common-threshold', type=float, default=DEFAULT_COMMON_THRESHOLD,
+                        help='Share of pages a key must appear on to go into the common bundle')
+    args = parser.parse_args()
+
+    root_dir = Path(args.root)
+    out_dir = Path(args.out) if args.out else root_dir / BUNDLE_DIR
+    catalog_paths = {locale: root_dir / config['catalog'] for locale, config in LOCALES.items()}
+    for override in args.catalog:
+        locale, _, path = override.partition('=')
+        if locale not in catalog_paths or not path:
+            parser.error(f"bad --catalog {override}")
+        catalog_paths[locale] = Path(path)
+
+    start_time = time.perf_counter()
+    catalogs = {}
+    catalog_sizes = {}
+    for locale, path in catalog_paths.items():
+        with open(path, 'r', encoding='utf-8') as f:
+            catalogs[locale] = json.load(f).get('strings', {})
+        catalog_sizes[locale] = os.path.getsize(path)
+
+    # Key usage per page (pre-rendered locale copies are skipped by find_pages)
+    pages = {page: page_keys(root_dir / page) for page in find_pages(root_dir, root_dir)}
+    usage = {}
+    for keys in pages.values():
+        for key in keys:
+            usage[key] = usage.get(key, 0) + 1
+    common_keys = {key for key, count in usage.items() if count >= args.common_threshold * len(pages)}
+    print(f"📄 {len(pages)} pages, {len(usage)} keys used, {len(common_keys)} in the common bundle")
+
+    page_bundles = {}
+    for page, keys in pages.items():
+        own = keys - common_keys
+        page_bundles[page] = (bundle_id(own), own) if own else (None, set())
+
+    written = 0
+    report = {locale: [] for locale in catalogs}
+    for locale, strings in catalogs.items():
+        locale_dir = out_dir / LOCALES[locale]['dir']
+        common = dump_compact(make_bundle(strings, common_keys))
+        written += write_if_changed(locale_dir / f"{COMMON_BUNDLE}.json", common)
+
+        sizes = {}
+        for name, keys in page_bundles.values():
+            if name and name not in sizes:
+                data = dump_compact(make_bundle(strings, keys))
+                sizes[name] = len(data)
+                written += write_if_changed(locale_dir / f"{name}.json", data)
+
+        # Drop bundles of key sets that no longer exist
+        for stale in locale_dir.glob('page-*.json'):
+            if stale.stem not in sizes:
+                stale.unlink()
+
+        for page, (name, _) in page_bundles.items():
+            report[locale].append((page, catalog_sizes[locale], len(common) + sizes.get(name, 0)))
+
+    manifest = {
+        'locales': {locale: f"/{BUNDLE_DIR}/{LOCALES[locale]['dir']}/" for locale in catalogs},
+        'common': f"{COMMON_BUNDLE}.json",
+        'pages': {f"/{page}": f"{name}.json" if name else None
+                  for page, (name, _) in sorted(page_bundles.items())},
+    }
+    manifest_data = dump_compact(manifest)
+    written += write_if_changed(out_dir / MANIFEST_FILE_NAME, manifest_data)
+    report = {locale: [(page, before, after + len(manifest_data)) for page, before, after in rows]
+              for locale, rows in report.items()}
+
+    bundle_count = len({name for name, _ in page_bundles.values() if name})
+    print(f"📦 {bundle_count} page bundles + common per locale, {written} files written "
+          f"in {time.perf_counter() - start_time:.2f}s")
+    print_size_report(report, list(catalogs))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,117 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+"""
+Check i18n catalogs for untranslated (Korean) values
+
+Each catalog gets a fingerprint file next to it (<catalog>.fingerprints.json)
+with a short hash and a Korean flag per key. Only keys whose value changed
+since the previous check are hashed and reported in detail; a catalog whose
+size and mtime are unchanged is not parsed at all. The check fails as long
+as any value still contains Korean, including keys already seen in an
+earlier run (they are listed by key). By default the deployed catalogs are
+checked, not the Korean extraction output. Use --all for the full report
+and --json for machine-readable output (e.g. from a pre-commit hook).
+"""
+import glob
 import json
+import hashlib
+import os
 import re
+import sys
+
+KOREAN_RE = re.compile(r'[\uac00-\ud7a3]')
+FINGERPRINT_SUFFIX = '.fingerprints.json'
+FINGERPRINT_VERSION = 2
+
+# Deployed catalogs: the English catalog read by i18n-loader.js, the zh-TW
+# catalog and the build_translations.py outputs
+DEFAULT_FILES = ['i18n_categorized.json', 'i18n_categorized_zh-tw.json']
+DEFAULT_BUILD_DIR = 'i18n_build'
+
+def default_files():
+    """Translated catalogs that exist in the current directory"""
+    built = glob.glob(os.path.join(DEFAULT_BUILD_DIR, '*.json'))
+    return DEFAULT_FILES + sorted(path for path in built if not path.endswith(FINGERPRINT_SUFFIX))
 
 def has_korean(text):
     """Check if text contains Korean characters"""
-    return bool(re.search(r'[\uac00-\ud7a3]', str(text)))
+    return KOREAN_RE.search(str(text)) is not None
+
+def flatten_values(obj, path='', result=None):
+    """Flatten a JSON structure to {path: string value}"""
+    if result is None:
+        result = {}
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            flatten_values(value, f'{path}.{key}' if path else key, result)
+    elif isinstance(obj, list):
+        for i, item in enumerate(obj):
+            flatten_values(item, f'{path}[{i}]', result)
+    elif isinstance(obj, str):
+        result[path] = obj
+    return result
+
+def value_fingerprint(text):
+    """Short content hash of a value"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+def load_fingerprints(filename):
+    """Previous check's fingerprints for a catalog, or None"""
+    try:
+        with open(filename + FINGERPRINT_SUFFIX, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if stored.get('version') != FINGERPRINT_VERSION:
+        return None
+    return stored
+
+def check_catalog(filename, update=True):
+    """Compare a catalog against its stored fingerprints
+
+    Returns {'file', 'total', 'korean', 'cached', 'changed': [...],
+    'unchanged_korean': [...]}, where each changed entry is {'key', 'status'
+    (added/changed/removed), 'korean', 'value'} and unchanged_korean lists
+    the keys with an unchanged fingerprint whose value contains Korean.
+    """
+    st = os.stat(filename)
+    stat = [st.st_size, st.st_mtime_ns]
+    stored = load_fingerprints(filename)
+
+    if stored and stored['stat'] == stat:
+        return {'file': filename, 'total': len(stored['values']), 'korean': stored['korean'],
+                'cached': True, 'changed': [],
+                'unchanged_korean': sorted(key for key, (_, korean) in stored['values'].items() if korean)}
+
+    with open(filename, 'r', encoding='utf-8') as f:
+        flat = flatten_values(json.load(f))
+
+    previous = stored['values'] if stored else {}
+    values = {}
+    changed = []
+    for key, text in flat.items():
+        fingerprint = value_fingerprint(text)
+        old = previous.get(key)
+        if old is not None and old[0] == fingerprint:
+            values[key] = old
+            continue
+        korean = int(has_korean(text))
+        values[key] = [fingerprint, korean]
+        status = 'added' if old is None else 'changed'
+        changed.append({'key': key, 'status': status, 'korean': bool(korean), 'value': text})
+    for key in previous.keys() - values.keys():
+        changed.append({'key': key, 'status': 'removed', 'korean': False, 'value': None})
+
+    korean_total = sum(korean for _, korean in values.values())
+    changed_keys = {item['key'] for item in changed}
+    unchanged_korean = sorted(key for key, (_, korean) in values.items() if korean and key not in changed_keys)
+    if update:
+        with open(filename + FINGERPRINT_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump({'version': FINGERPRINT_VERSION, 'stat': stat, 'korean': korean_total,
+                       'values': values}, f, separators=(',', ':'))
+
+    return {'file': filename, 'total': len(values), 'korean': korean_total,
+            'cached': False, 'changed': changed, 'unchanged_korean': unchanged_korean}
 
 def check_file(filename):
     """Check a JSON file for Korean text in VALUES only"""
@@ -14,33 +120,15 @@ def check_file(filename):
     print(f'{"="*80}')
 
     with open(filename, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    korean_values_found = []
-    total_values = 0
-
-    def check_recursive(obj, path=''):
-        nonlocal total_values
-
-        if isinstance(obj, dict):
-            for key, value in obj.items():
-                new_path = f'{path}.{key}' if path else key
-                check_recursive(value, new_path)
-        elif isinstance(obj, list):
-            for i, item in enumerate(obj):
-                check_recursive(item, f'{path}[{i}]')
-        elif isinstance(obj, str):
-            total_values += 1
-            if has_korean(obj):
-                korean_values_found.append({
-                    'path': path,
-                    'value': obj[:100] + ('...' if len(obj) > 100 else '')
-                })
-
-    check_recursive(data)
+        flat = flatten_values(json.load(f))
+
+    korean_values_found = [
+        {'path': path, 'value': value[:100] + ('...' if len(value) > 100 else '')}
+        for path, value in flat.items() if has_korean(value)
+    ]
 
     print(f'\n📊 Статистика:')
-    print(f'   Всего значений (строк): {total_values}')
+    print(f'   Всего значений (строк): {len(flat)}')
     print(f'   Значений с корейским: {len(korean_values_found)}')
 
     if korean_values_found:
@@ -57,28 +145,80 @@ def check_file(filename):
 
     return len(korean_values_found)
 
-if __name__ == '__main__':
-    print('🔍 ПРОВЕРКА ПЕРЕВОДА i18n ФАЙЛОВ')
-    print('Проверяем ТОЛЬКО значения (правая часть JSON), ключи игнорируем\n')
+def print_changes(result):
+    """Human-readable report of one catalog's changed keys"""
+    changed = result['changed']
+    state = 'без изменений' if not changed else f'изменено ключей: {len(changed)}'
+    print(f'📁 {result["file"]}: {result["total"]} значений, {result["korean"]} с корейским, {state}')
+    for item in changed:
+        if item['korean']:
+            value = item['value']
+            print(f'   ❌ {item["key"]}: "{value[:100]}{"..." if len(value) > 100 else ""}"')
+    pending = result['unchanged_korean']
+    if pending:
+        shown = ', '.join(pending[:10]) + (f' ... и еще {len(pending) - 10}' if len(pending) > 10 else '')
+        print(f'   ❌ Все еще не переведено (без изменений): {shown}')
 
-    files = [
-        'i18n_categorized.json',
-        'i18n_flat.json',
-        'text_strings.json'
-    ]
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Check i18n catalogs for untranslated Korean values')
+    parser.add_argument('files', nargs='*',
+                        help=f'Catalogs to check (default: {", ".join(DEFAULT_FILES)} and {DEFAULT_BUILD_DIR}/*.json)')
+    parser.add_argument('--all', action='store_true', help='Full report of every catalog (no fingerprints)')
+    parser.add_argument('--json', action='store_true', help='Machine-readable output')
+    parser.add_argument('--no-update', action='store_true', help='Do not store the new fingerprints')
+    args = parser.parse_args()
+    files = args.files or default_files()
+
+    if args.all:
+        print('🔍 ПРОВЕРКА ПЕРЕВОДА i18n ФАЙЛОВ')
+        print('Проверяем ТОЛЬКО значения (правая часть JSON), ключи игнорируем\n')
+
+        total_korean = 0
+        for filename in files:
+            try:
+                korean_count = check_file(filename)
+                total_korean += korean_count
+            except Exception as e:
+                print(f'❌ Ошибка при проверке {filename}: {e}')
 
-    total_korean = 0
+        print(f'\n{"="*80}')
+        print(f'🎯 ИТОГО: {total_korean} значений с корейским текстом')
+        if total_korean == 0:
+            print('✅ ВСЕ ФАЙЛЫ ПОЛНОСТЬЮ ПЕРЕВЕДЕНЫ!')
+        else:
+            print('❌ ТРЕБУЕТСЯ ДОПОЛНИТЕЛЬНЫЙ ПЕРЕВОД!')
+        print(f'{"="*80}')
+        return 0
+
+    results = []
+    errors = []
     for filename in files:
+        if not os.path.exists(filename):
+            continue
         try:
-            korean_count = check_file(filename)
-            total_korean += korean_count
-        except Exception as e:
-            print(f'❌ Ошибка при проверке {filename}: {e}')
+            results.append(check_catalog(filename, update=not args.no_update))
+        except (OSError, ValueError) as e:
+            errors.append({'file': filename, 'error': str(e)})
 
-    print(f'\n{"="*80}')
-    print(f'🎯 ИТОГО: {total_korean} значений с корейским текстом')
-    if total_korean == 0:
-        print('✅ ВСЕ ФАЙЛЫ ПОЛНОСТЬЮ ПЕРЕВЕДЕНЫ!')
+    # Fail while any value contains Korean; new or changed ones are reported in detail
+    new_korean = sum(item['korean'] for result in results for item in result['changed'])
+    korean_total = sum(result['korean'] for result in results)
+
+    if args.json:
+        json.dump({'files': results, 'errors': errors, 'new_korean': new_korean, 'korean': korean_total},
+                  sys.stdout, ensure_ascii=False, indent=2)
+        print()
     else:
-        print('❌ ТРЕБУЕТСЯ ДОПОЛНИТЕЛЬНЫЙ ПЕРЕВОД!')
-    print(f'{"="*80}')
+        for result in results:
+            print_changes(result)
+        for error in errors:
+            print(f'❌ Ошибка при проверке {error["file"]}: {error["error"]}')
+        if korean_total:
+            print(f'❌ Непереведенных значений: {korean_total} (новых или измененных: {new_korean})')
+
+    return 1 if korean_total or errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,14 +4,160 @@ Create improved i18n structure with categorized strings
 """
 import json
 import re
+from pathlib import Path
+
+from i18n_keys import KeyAllocator
+from i18n_output import ArtifactWriter, dump_json
+
+KEY_REGISTRY_FILE = '/Users/meditor/Projects/healthcare-web/i18n_categorized.keys.json'
+
+# Minified catalogs of --production. Content-hashed catalogs are published from
+# the translated, deployed catalogs by build_translations.py --hashed.
+PRODUCTION_OUTPUT_DIR = '/Users/meditor/Projects/healthcare-web/i18n_dist'
 
 def load_extracted_strings():
     """Load the extracted strings from JSON"""
     with open('/Users/meditor/Projects/healthcare-web/text_strings.json', 'r', encoding='utf-8') as f:
         return json.load(f)
 
+# Categorization rules, evaluated top to bottom; the first match wins.
+#   email     - contains '@' and starts with an e-mail address
+#   phone     - pattern found and the text has at least one digit
+#   keywords  - any keyword occurs as a substring
+#   search    - pattern found anywhere
+#   upper_in  - text.upper() is one of the values
+#   exact_in  - text is one of the values
+#   (no test) - default
+# An optional fourth item lists literals of which at least one must occur
+# for the rule to match (or NON_ASCII if the text must contain non-ASCII
+# characters); it lets the engine skip the regex for most texts.
+NON_ASCII = 'non-ascii'
+
+CATEGORY_RULES = [
+    ('contact', 'email', r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', ['@']),
+    ('contact', 'phone', r'[\d\-+()]{8,}'),
+    # Address
+    ('contact', 'keywords', ['street', 'city', '주소', '시', '구', '도', '빌딩', '층']),
+    ('dates', 'search', r'\d{4}년|\d{2}월', ['년', '월']),
+    ('navigation', 'upper_in', ['ABOUT', 'CONTACT', 'FAQ', 'NEWS', 'GALLERY', 'WEBZINE', 'INQUIRY',
+                                'DOWNLOAD', 'RESEARCH', 'HISTORY', 'LOCATION', 'OVERVIEW', 'DEVELOPMENT']),
+    ('navigation', 'exact_in', ['About', 'Menu', 'Search', 'Filter', 'Previous', 'Next', 'Close Search',
+                                'Skip to main content', 'Back to top', 'Main Menu', 'Navigation Menu']),
+    ('forms', 'exact_in', ['Name', 'Email', 'Phone', 'Message', 'Subject',
+                           '성함', '이메일', '전화번호', '내용', '문의유형']),
+    ('buttons', 'exact_in', ['Submit', 'Send', 'Download', 'Search', 'View', 'More', 'See more', 'More Details',
+                             'Play Video', 'Share', 'Pin', 'Love', '검색', '문의하기', 'View list']),
+    # Korean keyword groups; every keyword is Korean, so a hit implies Korean content
+    ('research', 'keywords', ['연구', '개발', '건강', '의료', '치료', '예방', '진단']),
+    ('company', 'keywords', ['센터', '본사', '연구소', '회사', '설립']),
+    ('services', 'keywords', ['서비스', '제품', '솔루션', '플랫폼', '기술']),
+    ('content_ko', 'search', r'[가-힣]', NON_ASCII),
+    ('content_en', None, None),
+]
+
+
+class CategoryMatcher:
+    """CATEGORY_RULES compiled once
+
+    Regexes are precompiled, membership lists become sets, and keyword
+    lists are split into ASCII and non-ASCII keywords. Whether a text is
+    pure ASCII is computed once per text; for ASCII texts (most of the
+    English catalog) the Korean keyword groups and Korean-only regexes are
+    skipped without scanning.
+
+    A pure-Python Aho-Corasick automaton was measured slower than a few
+    C-level substring searches for keyword lists this small, so keywords
+    are still tested with 'in', just far fewer of them.
+    """
+
+    def __init__(self, rules=CATEGORY_RULES):
+        self.rules = []
+
+        for index, rule in enumerate(rules):
+            category, test, spec = rule[:3]
+            requires = rule[3] if len(rule) > 3 else ()
+            needs_non_ascii = requires == NON_ASCII
+            if needs_non_ascii:
+                requires = ()
+            else:
+                requires = tuple(requires)
+                needs_non_ascii = bool(requires) and not any(lit.isascii() for lit in requires)
+
+            if test in ('email', 'phone', 'search'):
+                spec = re.compile(spec)
+            elif test in ('upper_in', 'exact_in'):
+                spec = frozenset(spec)
+            elif test == 'keywords':
+                spec = (tuple(k for k in spec if k.isascii()), tuple(k for k in spec if not k.isascii()))
+                needs_non_ascii = not spec[0]
+
+            self.rules.append((category, test, spec, requires, needs_non_ascii))
+
+    def categorize(self, text):
+        """Return the category of the first rule that matches text"""
+        is_ascii = text.isascii()
+        upper = None
+
+        for category, test, spec, requires, needs_non_ascii in self.rules:
+            if test is None:
+                return category
+            if is_ascii and needs_non_ascii:
+                continue
+            if requires and not any(lit in text for lit in requires):
+                continue
+
+            if test == 'email':
+                if spec.match(text):
+                    return category
+            elif test == 'phone':
+                if spec.search(text) and any(c.isdigit() for c in text):
+                    return category
+            elif test == 'keywords':
+                ascii_keywords, other_keywords = spec
+                if any(k in text for k in ascii_keywords):
+                    return category
+                if not is_ascii and any(k in text for k in other_keywords):
+                    return category
+            elif test == 'search':
+                if spec.search(text):
+                    return category
+            elif test == 'upper_in':
+                if upper is None:
+                    upper = text.upper()
+                if upper in spec:
+                    return category
+            elif text in spec:
+                return category
+
+        return 'other'
+
+    def categorize_many(self, texts):
+        """Categorize a whole list of strings, evaluating each distinct string once"""
+        seen = {}
+        result = []
+        for text in texts:
+            category = seen.get(text)
+            if category is None:
+                category = seen[text] = self.categorize(text)
+            result.append(category)
+        return result
+
+
+CATEGORY_MATCHER = CategoryMatcher()
+
+
 def categorize_string(text):
     """Categorize string based on content"""
+    return CATEGORY_MATCHER.categorize(text)
+
+
+def categorize_strings(texts):
+    """Categorize a list of strings in one call"""
+    return CATEGORY_MATCHER.categorize_many(texts)
+
+
+def _categorize_string_reference(text):
+    """Original if-chain categorizer, kept to verify and benchmark the rule engine"""
 
     # Email
     if '@' in text and re.match(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text):
@@ -128,11 +274,61 @@ def create_semantic_key(text, category):
 
     return key
 
+def benchmark_categorization(strings_dict, size=100000, rounds=3):
+    """Compare the original if-chain with the rule engine on a scaled-up catalog"""
+    import time
+
+    base = list(strings_dict.values())
+    # Numbered copies so the batch memo cannot just reuse the catalog results
+    texts = [base[i % len(base)] if i < len(base) else f"{base[i % len(base)]} #{i}"
+             for i in range(size)]
+
+    def timed(func):
+        best = float('inf')
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+        return best, result
+
+    legacy_time, legacy = timed(lambda: [_categorize_string_reference(t) for t in texts])
+    single_time, single = timed(lambda: [categorize_string(t) for t in texts])
+    batch_time, batch = timed(lambda: categorize_strings(texts))
+
+    print("CATEGORIZATION BENCHMARK")
+    print("-" * 60)
+    print(f"{len(texts)} strings from a {len(base)}-string catalog, best of {rounds}")
+    for name, seconds in [('if-chain (original)', legacy_time),
+                          ('rule engine, per string', single_time),
+                          ('rule engine, batch', batch_time)]:
+        print(f"  {name:26} {seconds * 1000:9.1f} ms {len(texts) / seconds:11.0f} str/s "
+              f"{legacy_time / seconds:6.2f}x")
+    mismatches = sum(1 for a, b, c in zip(legacy, single, batch) if not a == b == c)
+    print(f"  Mismatches against the original: {mismatches}")
+
+
 def main():
     """Main function to create improved i18n structure"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Create categorized i18n structure from text_strings.json')
+    parser.add_argument('--benchmark', type=int, nargs='?', const=100000, metavar='N',
+                        help='Benchmark categorization on N synthetic strings (default 100000) and exit')
+    parser.add_argument('--production', action='store_true',
+                        help='Also write minified catalogs with precompressed .gz/.br siblings to '
+                             '--prod-dir (the source catalogs stay readable)')
+    parser.add_argument('--prod-dir', default=PRODUCTION_OUTPUT_DIR,
+                        help=f"Directory for --production output (default: {PRODUCTION_OUTPUT_DIR})")
+    parser.add_argument('--compressed-sizes', action='store_true',
+                        help='Also measure gzip/brotli sizes of the source catalogs in the size report')
+    args = parser.parse_args()
 
     strings_dict = load_extracted_strings()
 
+    if args.benchmark:
+        benchmark_categorization(strings_dict, args.benchmark)
+        return
+
     # Categorize all strings
     categorized = {
         'navigation': {},
@@ -148,21 +344,14 @@ def main():
         'other': {}
     }
 
-    # Track used keys to avoid duplicates
-    used_keys = set()
+    # Allocate unique keys; strings seen in the previous run keep their key
+    allocator = KeyAllocator.from_registry(KEY_REGISTRY_FILE)
+    allocator.reserve(strings_dict.values())
 
-    for old_key, text in strings_dict.items():
-        category = categorize_string(text)
-        semantic_key = create_semantic_key(text, category)
+    categories = categorize_strings(list(strings_dict.values()))
 
-        # Handle duplicate keys
-        original_key = semantic_key
-        counter = 1
-        while semantic_key in used_keys:
-            semantic_key = f"{original_key}_{counter}"
-            counter += 1
-
-        used_keys.add(semantic_key)
+    for (old_key, text), category in zip(strings_dict.items(), categories):
+        semantic_key = allocator.allocate(create_semantic_key(text, category), text)
 
         if category in categorized:
             categorized[category][semantic_key] = text
@@ -181,11 +370,14 @@ def main():
     }
 
     # Save categorized structure
+    writer = ArtifactWriter(measure=args.compressed_sizes)
     output_file = '/Users/meditor/Projects/healthcare-web/i18n_categorized.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(i18n_structure, f, ensure_ascii=False, indent=2)
+    writer.write(output_file, dump_json(i18n_structure))
 
     print(f"Categorized i18n structure saved to: {output_file}")
+
+    allocator.save_registry(KEY_REGISTRY_FILE)
+    print(f"Key registry saved to: {KEY_REGISTRY_FILE}")
     print(f"\nCategory breakdown:")
     for category, strings in sorted(categorized.items()):
         if strings:
@@ -199,11 +391,20 @@ def main():
             flat_strings[flat_key] = value
 
     flat_output_file = '/Users/meditor/Projects/healthcare-web/i18n_flat.json'
-    with open(flat_output_file, 'w', encoding='utf-8') as f:
-        json.dump(flat_strings, f, ensure_ascii=False, indent=2)
+    writer.write(flat_output_file, dump_json(flat_strings))
 
     print(f"\nFlat i18n structure saved to: {flat_output_file}")
 
+    # Minified copies for deployment; the readable sources above are unchanged
+    if args.production:
+        minified = {
+            'i18n_categorized.json': dump_json(i18n_structure, production=True),
+            'i18n_flat.json': dump_json(flat_strings, production=True),
+        }
+        for file_name, data in minified.items():
+            writer.write(Path(args.prod_dir) / file_name, data, compress=True)
+        print(f"Production catalogs saved to: {args.prod_dir}")
+
     # Create TypeScript interface
     ts_output_file = '/Users/meditor/Projects/healthcare-web/i18n.d.ts'
     with open(ts_output_file, 'w', encoding='utf-8') as f:
@@ -223,5 +424,7 @@ def main():
 
     print(f"TypeScript definitions saved to: {ts_output_file}")
 
+    writer.print_report()
+
 if __name__ == '__main__':
     main()
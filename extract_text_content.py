@@ -5,10 +5,58 @@ Extract visible text content from HTML files
 import os
 import re
 import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from array import array
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from html.parser import HTMLParser
 from pathlib import Path
 from collections import defaultdict
 
+from i18n_keys import KeyAllocator
+from i18n_output import PRODUCTION_DIR_NAME, ArtifactWriter, alias_keys, dump_json, is_locale_copy, key_map_path
+
+DEFAULT_PROJECT_ROOT = '/Users/meditor/Projects/healthcare-web'
+CACHE_FILE_NAME = '.extraction_cache.json'
+CACHE_VERSION = 2
+SOURCE_INDEX_FILE_NAME = 'text_locations.sqlite'
+CATALOG_FILE_NAME = 'i18n_categorized.json'
+KEY_REGISTRY_FILE_NAME = 'text_strings.keys.json'
+
+# All skip rules of TextExtractor.is_technical folded into one anchored pattern:
+# URLs, asset paths, slug/ID-like strings and short CSS/JS fragments.
+# Only applied to cleaned text, which never contains newlines.
+_WHITESPACE_RE = re.compile(r'\s+')
+_TECHNICAL_RE = re.compile(
+    r'https?://'
+    r'|[./].*\.(?i:css|js|jpg|png|gif|svg|woff|ttf|eot)'
+    r'|[a-z0-9_]*-[a-z0-9_-]*$'
+    r'|(?=.{0,49}$).*[{}();:]'
+)
+CLASSIFIER_MEMO_SIZE = 65536
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=CLASSIFIER_MEMO_SIZE)
+def classify_text(text):
+    """Return the cleaned text, or None if it is empty or technical
+
+    Single-pass equivalent of clean_text() + is_technical(). Memoized, since
+    menu labels, footers and whitespace runs repeat on every page.
+    """
+    if not text:
+        return None
+
+    text = _WHITESPACE_RE.sub(' ', text.strip())
+    if len(text) < 2 or text.isspace() or _TECHNICAL_RE.match(text):
+        return None
+
+    return text
+
+
 class TextExtractor(HTMLParser):
     """Extract visible text content from HTML"""
 
@@ -35,12 +83,15 @@ class TextExtractor(HTMLParser):
         for attr_name, attr_value in attrs:
             if attr_name in self.TEXT_ATTRIBUTES and attr_value:
                 # Clean up attribute value
-                cleaned = self.clean_text(attr_value)
-                if cleaned and not self.is_technical(cleaned):
+                cleaned = classify_text(attr_value)
+                if cleaned:
+                    line, col = self.getpos()
                     self.texts.append({
                         'text': cleaned,
                         'type': f'attribute:{attr_name}',
-                        'tag': tag
+                        'tag': tag,
+                        'line': line,
+                        'col': col
                     })
 
     def handle_endtag(self, tag):
@@ -53,14 +104,20 @@ class TextExtractor(HTMLParser):
             return
 
         # Clean and validate text
-        cleaned = self.clean_text(data)
-        if cleaned and not self.is_technical(cleaned):
+        cleaned = classify_text(data)
+        if cleaned:
+            line, col = self.getpos()
             self.texts.append({
                 'text': cleaned,
                 'type': 'content',
-                'tag': self.current_tag
+                'tag': self.current_tag,
+                'line': line,
+                'col': col
             })
 
+    # clean_text() and is_technical() are the reference rules that
+    # classify_text() compiles; kept for callers and for --benchmark.
+
     @staticmethod
     def clean_text(text):
         """Clean and normalize text"""
@@ -105,66 +162,559 @@ class TextExtractor(HTMLParser):
         return False
 
 
-def extract_from_html_file(file_path):
-    """Extract text content from a single HTML file"""
+def iter_html_file_texts(file_path, chunk_size=STREAM_CHUNK_SIZE, info=None):
+    """Yield extracted text items while feeding the parser fixed-size chunks
+
+    Each feed() is cut just before a '<', so a text node is never split
+    across two feeds and the items match feeding the whole file at once.
+    Memory is bounded by the chunk size and the longest text run.
+    A read or parse error is printed and, if info is given, stored in
+    info['error'] so the (partial) result is not cached.
+    """
+    parser = TextExtractor()
+    pending = ''
+
     try:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+            for chunk in iter(lambda: f.read(chunk_size), ''):
+                pending += chunk
+                cut = pending.rfind('<')
+                if cut <= 0:
+                    continue
+
+                parser.feed(pending[:cut])
+                pending = pending[cut:]
 
-        parser = TextExtractor()
-        parser.feed(content)
+                items, parser.texts = parser.texts, []
+                yield from items
 
-        return parser.texts
+        parser.feed(pending)
+        yield from parser.texts
     except Exception as e:
         print(f"Error processing {file_path}: {e}")
-        return []
+        if info is not None:
+            info['error'] = str(e)
+
+
+def extract_from_html_file(file_path):
+    """Extract text content from a single HTML file"""
+    return list(iter_html_file_texts(file_path))
+
+
+class _RawStringCollector(TextExtractor):
+    """Collect every raw string TextExtractor would classify"""
+
+    def __init__(self):
+        super().__init__()
+        self.raw = []
+
+    def handle_starttag(self, tag, attrs):
+        self.current_tag = tag
+        if tag in self.SKIP_TAGS:
+            self.skip_content = True
+            return
+        self.raw.extend(value for name, value in attrs if name in self.TEXT_ATTRIBUTES and value)
+
+    def handle_data(self, data):
+        if not self.skip_content and data:
+            self.raw.append(data)
+
+
+def benchmark_classifier(html_files, rounds=5):
+    """Compare clean_text + is_technical against classify_text on real pages"""
+    raw = []
+    for html_file in html_files:
+        collector = _RawStringCollector()
+        with open(html_file, 'r', encoding='utf-8', errors='ignore') as f:
+            collector.feed(f.read())
+        raw.extend(collector.raw)
+
+    def legacy(text):
+        cleaned = TextExtractor.clean_text(text)
+        if cleaned and not TextExtractor.is_technical(cleaned):
+            return cleaned
+        return None
+
+    mismatches = sum(1 for text in set(raw) if legacy(text) != classify_text.__wrapped__(text))
+
+    def timed(func):
+        best = float('inf')
+        for _ in range(rounds):
+            classify_text.cache_clear()
+            start = time.perf_counter()
+            for text in raw:
+                func(text)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    results = [
+        ('legacy (clean_text + is_technical)', timed(legacy)),
+        ('compiled, no memo', timed(classify_text.__wrapped__)),
+        ('compiled + memo', timed(classify_text)),
+    ]
+
+    print("CLASSIFIER BENCHMARK")
+    print("-" * 80)
+    print(f"{len(html_files)} files, {len(raw)} strings ({len(set(raw))} distinct), best of {rounds}")
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"{name:40} {seconds * 1000:9.2f} ms {len(raw) / seconds:12.0f} str/s "
+              f"{baseline / seconds:6.2f}x")
+    print(f"Mismatches against legacy rules: {mismatches}")
+
+
+def _file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+def extract_file_task(file_path):
+    """Extract one file and report (texts, {'bytes', 'seconds', 'worker'[, 'error']})"""
+    info = {'bytes': _file_size(file_path), 'seconds': 0.0, 'worker': os.getpid()}
+    start = time.perf_counter()
+    texts = list(iter_html_file_texts(file_path, info=info))
+    info['seconds'] = time.perf_counter() - start
+
+    return texts, info
+
+
+def stream_file_task(file_path):
+    """Streaming variant of extract_file_task
+
+    Returns a generator of items and an info dict whose timing is filled in
+    once the generator has been exhausted.
+    """
+    info = {'bytes': _file_size(file_path), 'seconds': 0.0, 'worker': os.getpid()}
+
+    def timed_items():
+        start = time.perf_counter()
+        yield from iter_html_file_texts(file_path, info=info)
+        info['seconds'] = time.perf_counter() - start
+
+    return timed_items(), info
+
+
+class ExtractionCache:
+    """On-disk cache of extracted texts keyed by file size, mtime and content hash
+
+    A file whose size and mtime match its entry is a hit without being read;
+    otherwise its SHA-1 is compared, so touched-but-unchanged files still hit.
+    """
+
+    def __init__(self, project_root, rebuild=False):
+        self.project_root = Path(project_root)
+        self.path = self.project_root / CACHE_FILE_NAME
+        self.entries = {} if rebuild else self._load()
+        self.updated = {}
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if data.get('version') != CACHE_VERSION:
+            return {}
+        return data.get('files', {})
+
+    @staticmethod
+    def file_digest(file_path):
+        """SHA-1 of the raw file bytes"""
+        digest = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def lookup(self, file_path):
+        """Return cached texts for file_path, or None if it must be parsed"""
+        key = str(Path(file_path).relative_to(self.project_root))
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            # Unreadable: parse it so the error is reported, nothing is cached
+            self.misses += 1
+            return None
+        entry = self.entries.get(key)
+
+        if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns:
+            self.hits += 1
+            self.updated[key] = entry
+            return entry['texts']
+
+        try:
+            digest = self.file_digest(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+        if entry and entry['sha1'] == digest:
+            self.hits += 1
+            self.updated[key] = dict(entry, size=st.st_size, mtime=st.st_mtime_ns)
+            return entry['texts']
+
+        self.misses += 1
+        self.pending[key] = {'size': st.st_size, 'mtime': st.st_mtime_ns, 'sha1': digest}
+        return None
+
+    def store(self, file_path, texts):
+        """Record freshly extracted texts for a file previously missed by lookup()
+
+        Only call this for successful extractions: a failed file must not
+        be cached, so it is parsed (and its error reported) again next run.
+        """
+        key = str(Path(file_path).relative_to(self.project_root))
+        entry = self.pending.pop(key, None)
+        if entry is not None:
+            entry['texts'] = texts
+            self.updated[key] = entry
+
+    def save(self):
+        """Write the cache, dropping entries for files not seen in this run"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.updated}, f, ensure_ascii=False)
+
+
+class StringTable:
+    """Interned strings: each distinct value is stored once and referenced by id"""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        """Return the id of value, adding it on first sight"""
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def sorted_ids(self):
+        """Ids ordered by their string value"""
+        return sorted(range(len(self.values)), key=self.values.__getitem__)
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class OccurrenceTable:
+    """Column store of extracted items
+
+    Every occurrence is one row of unsigned int columns: text, type, tag and
+    file ids pointing into string tables plus the source line and column, so
+    a label repeated on every page costs 24 bytes per occurrence instead of
+    a dict and a string copy.
+    """
+
+    def __init__(self):
+        self.texts = StringTable()
+        self.types = StringTable()
+        self.tags = StringTable()
+        self.files = StringTable()
+        self.text_ids = array('I')
+        self.type_ids = array('I')
+        self.tag_ids = array('I')
+        self.file_ids = array('I')
+        self.lines = array('I')
+        self.cols = array('I')
+
+    def add(self, file_id, item):
+        """Record one extracted item ({'text', 'type', 'tag', 'line', 'col'})"""
+        self.text_ids.append(self.texts.intern(item['text']))
+        self.type_ids.append(self.types.intern(item['type']))
+        self.tag_ids.append(self.tags.intern(item['tag']))
+        self.file_ids.append(file_id)
+        self.lines.append(item['line'])
+        self.cols.append(item['col'])
+
+    def unique_counts_by_type(self):
+        """Map type id -> number of distinct text ids seen with that type"""
+        counts = defaultdict(int)
+        for type_id, _ in set(zip(self.type_ids, self.text_ids)):
+            counts[type_id] += 1
+        return counts
+
+    def column_bytes(self):
+        """Bytes held by the occurrence columns"""
+        columns = (self.text_ids, self.type_ids, self.tag_ids, self.file_ids,
+                   self.lines, self.cols)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def __len__(self):
+        return len(self.text_ids)
+
+
+def load_catalog_keys(catalog_path):
+    """Map text -> [category.key] from the categorized catalog, {} if there is none yet
+
+    These are the data-i18n keys written into the pages, as opposed to the
+    extraction keys of text_strings.json.
+    """
+    try:
+        with open(catalog_path, 'r', encoding='utf-8') as f:
+            strings = json.load(f).get('strings', {})
+    except (OSError, ValueError):
+        return {}
+
+    keys = defaultdict(list)
+    for category, entries in strings.items():
+        if not isinstance(entries, dict):
+            continue
+        for key, text in entries.items():
+            if isinstance(text, str) and text.strip():
+                keys[text.strip()].append(f"{category}.{key}")
+    return keys
+
+
+def write_source_index(index_path, table, keys_by_text_id, catalog_keys=None):
+    """Write the key -> (file, line, col, tag, type) index to SQLite
+
+    Strings are found by extraction key, by text and by the categorized
+    data-i18n keys in catalog_keys ({text: [category.key]}). The database
+    is built next to index_path and renamed over it, so readers never see
+    a half-written index.
+    """
+    index_path = Path(index_path)
+    tmp_path = index_path.with_name(index_path.name + '.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript("""
+            CREATE TABLE strings (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, text TEXT NOT NULL);
+            CREATE TABLE catalog_keys (key TEXT PRIMARY KEY, string_id INTEGER NOT NULL REFERENCES strings(id));
+            CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+            CREATE TABLE occurrences (
+                string_id INTEGER NOT NULL REFERENCES strings(id),
+                file_id INTEGER NOT NULL REFERENCES files(id),
+                line INTEGER NOT NULL,
+                col INTEGER NOT NULL,
+                tag TEXT,
+                type TEXT NOT NULL
+            );
+        """)
+        conn.executemany('INSERT INTO strings VALUES (?, ?, ?)',
+                         ((text_id, key, table.texts[text_id]) for text_id, key in keys_by_text_id.items()))
+        conn.executemany('INSERT OR IGNORE INTO catalog_keys VALUES (?, ?)', (
+            (key, table.texts.ids[text])
+            for text, keys in (catalog_keys or {}).items() if text in table.texts.ids
+            for key in keys
+        ))
+        conn.executemany('INSERT INTO files VALUES (?, ?)', enumerate(table.files.values))
+        conn.executemany('INSERT INTO occurrences VALUES (?, ?, ?, ?, ?, ?)', (
+            (text_id, file_id, line, col, table.tags[tag_id], table.types[type_id])
+            for text_id, file_id, line, col, tag_id, type_id in zip(
+                table.text_ids, table.file_ids, table.lines, table.cols,
+                table.tag_ids, table.type_ids)
+        ))
+        conn.execute('CREATE INDEX occurrences_by_string ON occurrences(string_id)')
+        conn.execute('CREATE INDEX occurrences_by_file ON occurrences(file_id)')
+        conn.execute('CREATE INDEX strings_by_text ON strings(text)')
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, index_path)
+
+
+def find_occurrences(index_path, key_or_text):
+    """Return [(path, line, col, tag, type)] for a key or exact text in the index
+
+    key_or_text may be an extraction key, a categorized data-i18n key
+    (category.key) or the text itself. Raises sqlite3.Error if the index
+    is missing or was written by an older version.
+    """
+    conn = sqlite3.connect(f'file:{index_path}?mode=ro', uri=True)
+    try:
+        return conn.execute("""
+            SELECT files.path, occurrences.line, occurrences.col, occurrences.tag, occurrences.type
+            FROM strings
+            JOIN occurrences ON occurrences.string_id = strings.id
+            JOIN files ON files.id = occurrences.file_id
+            WHERE strings.key = ? OR strings.text = ?
+               OR strings.id IN (SELECT string_id FROM catalog_keys WHERE key = ?)
+            ORDER BY files.path, occurrences.line, occurrences.col
+        """, (key_or_text, key_or_text, key_or_text)).fetchall()
+    finally:
+        conn.close()
+
+
+def iter_extractions(html_files, jobs=1, cache=None):
+    """Yield (file, texts, info) in the order of html_files
+
+    info holds 'bytes', 'seconds' and 'worker'; read it after consuming texts.
+    With jobs > 1 the files are sharded across a process pool; results are
+    still yielded in input order so the merged output matches a serial run.
+    Serial runs without a cache stream items straight from the parser.
+    Files served from the cache are yielded with worker None; files that
+    failed to read or parse have info['error'] set and are not cached.
+    """
+    cached = {}
+    pending = []
+    for html_file in html_files:
+        texts = cache.lookup(html_file) if cache else None
+        if texts is None:
+            pending.append(html_file)
+        else:
+            cached[html_file] = texts
+
+    def run_pending():
+        if jobs <= 1:
+            task = extract_file_task if cache else stream_file_task
+            for html_file in pending:
+                yield task(html_file)
+            return
+
+        chunksize = max(1, len(pending) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(extract_file_task, pending, chunksize=chunksize)
+
+    results = run_pending()
+    for html_file in html_files:
+        if html_file in cached:
+            yield html_file, cached[html_file], {'bytes': 0, 'seconds': 0.0, 'worker': None}
+            continue
+
+        texts, info = next(results)
+        if cache and 'error' not in info:
+            cache.store(html_file, texts)
+        yield html_file, texts, info
+
+
+def print_timing_summary(worker_stats, wall_time):
+    """Print files/sec and bytes/sec for every worker and the whole run"""
+    total_files = sum(stats['files'] for stats in worker_stats.values())
+    total_bytes = sum(stats['bytes'] for stats in worker_stats.values())
+
+    print(f"\n\nTIMING SUMMARY:")
+    print("-" * 80)
+    print(f"{'worker':>10} {'files':>8} {'busy s':>10} {'files/s':>10} {'KB/s':>12}")
+    for worker, stats in sorted(worker_stats.items()):
+        busy = stats['seconds'] or 1e-9
+        print(f"{worker:>10} {stats['files']:>8} {stats['seconds']:>10.3f} "
+              f"{stats['files'] / busy:>10.1f} {stats['bytes'] / busy / 1024:>12.1f}")
+
+    wall = wall_time or 1e-9
+    print(f"{'total':>10} {total_files:>8} {wall_time:>10.3f} "
+          f"{total_files / wall:>10.1f} {total_bytes / wall / 1024:>12.1f}")
 
 
 def main():
     """Main function to extract text from all HTML files"""
-    project_root = Path('/Users/meditor/Projects/healthcare-web')
-
-    # Find all HTML files
-    html_files = list(project_root.glob('**/*.html'))
+    parser = argparse.ArgumentParser(description='Extract visible text content from HTML files')
+    parser.add_argument('--root', default=DEFAULT_PROJECT_ROOT, help='Project root to scan')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes (default: 1, serial)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Do not read or write the {CACHE_FILE_NAME} extraction cache')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Ignore cached results and re-parse every file')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Benchmark the text classifier on the mirrored pages and exit')
+    parser.add_argument('--where', metavar='KEY_OR_TEXT',
+                        help=f'Look up where a key (extraction or category.key) or string occurs '
+                             f'using {SOURCE_INDEX_FILE_NAME} and exit')
+    parser.add_argument('--production', action='store_true',
+                        help=f'Also write minified text_strings.json/.js with precompressed .gz/.br '
+                             f'siblings to <root>/{PRODUCTION_DIR_NAME} (sources stay readable)')
+    parser.add_argument('--prod-dir', help=f'Output directory for --production (default: <root>/{PRODUCTION_DIR_NAME})')
+    parser.add_argument('--aliases', action='store_true',
+                        help='With --production, use short key aliases in the production files '
+                             '(alias map in text_strings.keymap.json, debug only)')
+    parser.add_argument('--compressed-sizes', action='store_true',
+                        help='Also measure gzip/brotli sizes of the source files in the size report')
+    args = parser.parse_args()
+    if args.aliases and not args.production:
+        parser.error('--aliases requires --production')
+
+    project_root = Path(args.root)
+
+    if args.where:
+        index_file = project_root / SOURCE_INDEX_FILE_NAME
+        if not index_file.exists():
+            print(f"Source location index not found: {index_file}")
+            print("Run the extraction first (without --where) to build it.")
+            raise SystemExit(1)
+        try:
+            occurrences = find_occurrences(index_file, args.where)
+        except sqlite3.Error as e:
+            print(f"Cannot read source location index {index_file}: {e}")
+            print("Run the extraction again (without --where) to rebuild it.")
+            raise SystemExit(1)
+        for path, line, col, tag, text_type in occurrences:
+            print(f"{path}:{line}:{col}  <{tag}> {text_type}")
+        print(f"\n{len(occurrences)} occurrences")
+        return
+
+    cache = None if args.no_cache else ExtractionCache(project_root, rebuild=args.rebuild)
+
+    # Find all HTML files; translated copies of prerender_locales.py are not sources
+    html_files = [f for f in project_root.glob('**/*.html') if not is_locale_copy(f, project_root)]
     print(f"Found {len(html_files)} HTML files\n")
 
-    # Storage for all texts
-    all_texts = []
-    unique_texts = set()
-    texts_by_type = defaultdict(set)
-    file_texts = {}
+    if args.benchmark:
+        benchmark_classifier(html_files)
+        return
+
+    # Occurrences as interned id columns
+    table = OccurrenceTable()
+    worker_stats = defaultdict(lambda: {'files': 0, 'bytes': 0, 'seconds': 0.0})
+    failed_files = []
 
     # Process each file
-    for html_file in html_files:
-        relative_path = html_file.relative_to(project_root)
-        texts = extract_from_html_file(html_file)
+    started = time.perf_counter()
+    for html_file, texts, info in iter_extractions(html_files, args.jobs, cache):
+        file_id = table.files.intern(str(html_file.relative_to(project_root)))
+        for item in texts:
+            table.add(file_id, item)
 
-        if texts:
-            file_texts[str(relative_path)] = texts
+        if 'error' in info:
+            failed_files.append(html_file)
+        if info['worker'] is not None:
+            stats = worker_stats[info['worker']]
+            stats['files'] += 1
+            stats['bytes'] += info['bytes']
+            stats['seconds'] += info['seconds']
 
-        for item in texts:
-            text = item['text']
-            all_texts.append(item)
-            unique_texts.add(text)
-            texts_by_type[item['type']].add(text)
+    wall_time = time.perf_counter() - started
+
+    if cache:
+        cache.save()
 
     # Generate report
     print("=" * 80)
     print("TEXT EXTRACTION REPORT")
     print("=" * 80)
     print(f"\nTotal HTML files processed: {len(html_files)}")
-    print(f"Total text items found: {len(all_texts)}")
-    print(f"Unique text strings: {len(unique_texts)}")
+    if failed_files:
+        print(f"Files that could not be read or parsed (not cached): {len(failed_files)}")
+    print(f"Total text items found: {len(table)}")
+    print(f"Unique text strings: {len(table.texts)}")
+    print(f"Occurrence table: {table.column_bytes() / 1024:.1f} KB in id columns")
 
     print(f"\n\nBREAKDOWN BY TYPE:")
     print("-" * 80)
-    for text_type, texts in sorted(texts_by_type.items()):
-        print(f"{text_type:30} {len(texts):6} unique strings")
+    type_counts = table.unique_counts_by_type()
+    for type_id in table.types.sorted_ids():
+        print(f"{table.types[type_id]:30} {type_counts[type_id]:6} unique strings")
+
+    sorted_text_ids = table.texts.sorted_ids()
 
     # Generate unique texts sorted alphabetically
     print(f"\n\nUNIQUE TEXT STRINGS (sorted alphabetically):")
     print("=" * 80)
-    for i, text in enumerate(sorted(unique_texts), 1):
+    for i, text_id in enumerate(sorted_text_ids, 1):
+        text = table.texts[text_id]
         # Truncate long strings for display
         display_text = text if len(text) <= 100 else text[:97] + "..."
         print(f"{i:4}. {display_text}")
@@ -174,54 +724,78 @@ def main():
         'metadata': {
             'extracted_at': '2025-12-23',
             'total_files': len(html_files),
-            'total_strings': len(unique_texts),
+            'total_strings': len(table.texts),
             'project': 'healthcare-web'
         },
         'strings': {}
     }
 
-    # Create keys from text
-    for text in sorted(unique_texts):
-        # Generate a key (simple version - can be improved)
-        key = re.sub(r'[^a-zA-Z0-9]+', '_', text.lower())[:50].strip('_')
+    # Create keys from text; texts seen in the previous run keep their key
+    registry_file = project_root / KEY_REGISTRY_FILE_NAME
+    allocator = KeyAllocator.from_registry(registry_file)
+    allocator.reserve(table.texts.values)
 
-        # Handle duplicates
-        original_key = key
-        counter = 1
-        while key in i18n_structure['strings']:
-            key = f"{original_key}_{counter}"
-            counter += 1
+    keys_by_text_id = {}
+    for text_id in sorted_text_ids:
+        text = table.texts[text_id]
+        # Generate a key (simple version - can be improved)
+        base_key = re.sub(r'[^a-zA-Z0-9]+', '_', text.lower())[:50].strip('_')
+        key = allocator.allocate(base_key, text)
 
         i18n_structure['strings'][key] = text
+        keys_by_text_id[text_id] = key
 
     # Save to JSON file
+    writer = ArtifactWriter(measure=args.compressed_sizes)
     output_file = project_root / 'extracted_text_content.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(i18n_structure, f, ensure_ascii=False, indent=2)
+    writer.write(output_file, dump_json(i18n_structure))
 
     print(f"\n\nJSON output saved to: {output_file}")
 
+    allocator.save_registry(registry_file)
+    print(f"Key registry saved to: {registry_file}")
+
     # Also create a simpler key-value structure
     simple_structure = {key: value for key, value in sorted(i18n_structure['strings'].items())}
 
     simple_output_file = project_root / 'text_strings.json'
-    with open(simple_output_file, 'w', encoding='utf-8') as f:
-        json.dump(simple_structure, f, ensure_ascii=False, indent=2)
+    writer.write(simple_output_file, dump_json(simple_structure))
 
     print(f"Simple strings JSON saved to: {simple_output_file}")
 
     # Create JavaScript/TypeScript version
     js_output_file = project_root / 'text_strings.js'
-    with open(js_output_file, 'w', encoding='utf-8') as f:
-        f.write("// Auto-generated text strings from HTML files\n")
-        f.write("// Generated on 2025-12-23\n\n")
-        f.write("export const TEXT_STRINGS = ")
-        json.dump(simple_structure, f, ensure_ascii=False, indent=2)
-        f.write(";\n\n")
-        f.write("export default TEXT_STRINGS;\n")
+    writer.write(js_output_file, "// Auto-generated text strings from HTML files\n"
+                                 "// Generated on 2025-12-23\n\n"
+                                 f"export const TEXT_STRINGS = {dump_json(simple_structure)};\n\n"
+                                 "export default TEXT_STRINGS;\n")
 
     print(f"JavaScript version saved to: {js_output_file}")
 
+    # Minified, precompressed copies for deployment; the sources above stay readable
+    if args.production:
+        prod_dir = Path(args.prod_dir) if args.prod_dir else project_root / PRODUCTION_DIR_NAME
+        prod_structure = simple_structure
+        if args.aliases:
+            prod_structure, key_map = alias_keys(simple_structure)
+            writer.write(key_map_path(simple_output_file), dump_json(key_map), debug=True)
+            print(f"Key aliases saved to: {key_map_path(simple_output_file)} (debug only)")
+        prod_json = dump_json(prod_structure, production=True)
+        writer.write(prod_dir / simple_output_file.name, prod_json, compress=True)
+        writer.write(prod_dir / js_output_file.name,
+                     f"export const TEXT_STRINGS={prod_json};export default TEXT_STRINGS;\n", compress=True)
+        print(f"Production files saved to: {prod_dir}")
+
+    index_file = project_root / SOURCE_INDEX_FILE_NAME
+    write_source_index(index_file, table, keys_by_text_id, load_catalog_keys(project_root / CATALOG_FILE_NAME))
+    print(f"Source location index saved to: {index_file}")
+
+    writer.print_report()
+    print_timing_summary(worker_stats, wall_time)
+
+    if cache:
+        print(f"\nExtraction cache: {cache.hits} hits, {cache.misses} misses ({cache.path})")
+
     print("\n" + "=" * 80)
     print("EXTRACTION COMPLETE!")
     print("=" * 80)
@@ -21,16 +21,135 @@
         return '/i18n_categorized.json'; // English по умолчанию
     }
 
+    /**
+     * Загрузка бандлов страницы (bundle_translations.py): общий + бандл страницы
+     * Возвращает null, если для страницы нет бандла - тогда грузится весь каталог
+     */
+    async function loadBundles() {
+        const currentLang = localStorage.getItem('preferred-language') || 'en';
+        const response = await fetch('/i18n_bundles/manifest.json');
+        if (!response.ok) {
+            return null;
+        }
+
+        const manifest = await response.json();
+        const baseUrl = manifest.locales[currentLang];
+        let path = decodeURIComponent(location.pathname);
+        if (path.endsWith('/')) {
+            path += 'index.html';
+        }
+        if (!baseUrl || !(path in manifest.pages)) {
+            return null;
+        }
+
+        const files = [manifest.common];
+        if (manifest.pages[path]) {
+            files.push(manifest.pages[path]);
+        }
+        console.log('[i18n] Loading bundles:', files.map(file => baseUrl + file));
+
+        const bundles = await Promise.all(files.map(file =>
+            fetch(baseUrl + file).then(r => r.json())
+        ));
+        const strings = {};
+        bundles.forEach(bundle => {
+            for (const [category, values] of Object.entries(bundle.strings || {})) {
+                strings[category] = Object.assign(strings[category] || {}, values);
+            }
+        });
+        return strings;
+    }
+
+    /**
+     * Применить дельту каталога: ключи вида "категория.ключ" для замены и удаления
+     */
+    function applyDelta(strings, delta) {
+        for (const [flatKey, value] of Object.entries(delta.set || {})) {
+            const dot = flatKey.indexOf('.');
+            const category = flatKey.slice(0, dot);
+            strings[category] = strings[category] || {};
+            strings[category][flatKey.slice(dot + 1)] = value;
+        }
+        for (const flatKey of delta.delete || []) {
+            const dot = flatKey.indexOf('.');
+            const category = strings[flatKey.slice(0, dot)];
+            if (category) {
+                delete category[flatKey.slice(dot + 1)];
+            }
+        }
+    }
+
+    /**
+     * Загрузка каталога с хешем в имени (build_translations.py --hashed)
+     * Проверяется только маленький манифест; у каждого каталога своя версия.
+     * Каталог текущей версии берется из localStorage, а при смене версии
+     * по возможности загружается дельта
+     * Возвращает null, если для файла нет версии с хешем
+     */
+    async function loadVersionedCatalog(translationFile) {
+        const name = translationFile.split('/').pop();
+        const response = await fetch('/i18n_dist/i18n-manifest.json', { cache: 'no-cache' });
+        if (!response.ok) {
+            return null;
+        }
+
+        const manifest = await response.json();
+        const entry = manifest.catalogs && manifest.catalogs[name];
+        if (!entry) {
+            return null;
+        }
+
+        const cacheKey = 'i18n-catalog:' + name;
+        let cached = null;
+        try {
+            cached = JSON.parse(localStorage.getItem(cacheKey));
+        } catch (e) {
+            cached = null;
+        }
+        if (cached && cached.version === entry.version) {
+            console.log('[i18n] Using cached catalog version', entry.version);
+            return cached.data;
+        }
+
+        let data;
+        const deltaFile = cached && entry.deltas && entry.deltas[cached.version];
+        if (deltaFile) {
+            console.log('[i18n] Loading catalog delta:', deltaFile);
+            const delta = await (await fetch('/i18n_dist/' + deltaFile)).json();
+            data = cached.data;
+            applyDelta(data.strings, delta);
+        } else {
+            console.log('[i18n] Loading catalog:', entry.file);
+            data = await (await fetch('/i18n_dist/' + entry.file)).json();
+        }
+
+        try {
+            localStorage.setItem(cacheKey, JSON.stringify({ version: entry.version, data: data }));
+        } catch (e) {
+            // localStorage переполнен - просто не кешируем
+        }
+        return data;
+    }
+
     /**
      * Загрузка JSON файла с переводами
      */
     async function loadTranslations() {
         try {
-            const translationFile = getTranslationFile();
-            console.log('[i18n] Loading translations from:', translationFile);
+            const bundled = await loadBundles().catch(() => null);
+            if (bundled) {
+                i18nStrings = bundled;
+                console.log('[i18n] Loaded bundled translations:', Object.keys(i18nStrings).length, 'categories');
+                return i18nStrings;
+            }
 
-            const response = await fetch(translationFile);
-            const data = await response.json();
+            const translationFile = getTranslationFile();
+            let data = await loadVersionedCatalog(translationFile).catch(() => null);
+            if (!data) {
+                console.log('[i18n] Loading translations from:', translationFile);
+                const response = await fetch(translationFile);
+                data = await response.json();
+            }
             i18nStrings = data.strings || {};
             console.log('[i18n] Loaded translations:', Object.keys(i18nStrings).length, 'categories');
             return i18nStrings;
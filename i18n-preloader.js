@@ -1,60 +1,125 @@
 /**
- * i18n Pre-loader - Загружает переводы СИНХРОННО в <head>
- * Выполняется ДО всех WordPress скриптов
+ * i18n Pre-loader - Применяет критичные переводы первого экрана
+ * Переводы встроены в <head> как <script type="application/json" id="i18n-critical">
+ * (replace_hardcoded_strings_v2.py --inline-critical), поэтому сетевых запросов нет.
+ * Скрипт подключается в <head> БЕЗ defer сразу после этого блока: MutationObserver
+ * переводит элементы по мере разбора документа, до первой отрисовки.
+ * Остальные переводы загружает i18n-loader.js асинхронно.
  */
 (function() {
     'use strict';
 
-    // Синхронная загрузка JSON
-    const xhr = new XMLHttpRequest();
-    xhr.open('GET', '/i18n_categorized.json', false); // false = синхронно
-    xhr.send(null);
+    const block = document.getElementById('i18n-critical');
+    if (!block) {
+        return;
+    }
 
-    if (xhr.status === 200) {
-        const data = JSON.parse(xhr.responseText);
-        const strings = data.strings || {};
+    let payload;
+    try {
+        payload = JSON.parse(block.textContent);
+    } catch (e) {
+        console.error('[i18n-preloader] Invalid critical translations:', e);
+        return;
+    }
 
-        console.log('[i18n-preloader] Loaded:', Object.keys(strings).length, 'categories');
+    const currentLang = localStorage.getItem('preferred-language') || 'en';
+    const strings = payload[currentLang] || {};
 
-        // Функция получения строки
-        function getString(path) {
-            const keys = path.split('.');
-            let value = strings;
-            for (const key of keys) {
-                if (value && typeof value === 'object') {
-                    value = value[key];
-                } else {
-                    return path;
-                }
+    // Функция получения строки
+    function getString(path) {
+        const keys = path.split('.');
+        let value = strings;
+        for (const key of keys) {
+            if (value && typeof value === 'object') {
+                value = value[key];
+            } else {
+                return path;
             }
-            return value || path;
         }
+        return value || path;
+    }
+
+    // Соответствие data-атрибута и способа применения перевода
+    const ATTRIBUTES = {
+        'data-i18n-placeholder': (element, value) => { element.placeholder = value; },
+        'data-i18n-title': (element, value) => { element.title = value; },
+        'data-i18n-alt': (element, value) => { element.alt = value; },
+        'data-i18n-aria': (element, value) => { element.setAttribute('aria-label', value); }
+    };
+    const SELECTOR = '[data-i18n],' + Object.keys(ATTRIBUTES).map(attr => '[' + attr + ']').join(',');
 
-        // Применяем переводы сразу
-        function applyNow() {
-            let count = 0;
-            document.querySelectorAll('[data-i18n]').forEach(element => {
-                const key = element.getAttribute('data-i18n');
-                const translation = getString(key);
+    const done = new WeakSet();
+    let count = 0;
 
-                if (translation && translation !== key) {
+    // Перевести один элемент; текст - только когда он уже разобран
+    function translateElement(element) {
+        if (done.has(element)) {
+            return;
+        }
+
+        let pending = false;
+        const key = element.getAttribute('data-i18n');
+        if (key) {
+            const translation = getString(key);
+            // Элементы с дочерними тегами (иконки, анимации) оставляем i18n-loader.js
+            if (translation && translation !== key && element.children.length === 0) {
+                if (element.textContent.trim()) {
                     element.textContent = translation;
                     count++;
+                } else {
+                    pending = true;
                 }
-            });
-            console.log('[i18n-preloader] Applied', count, 'translations');
+            }
         }
 
-        // Применяем сразу если DOM готов
-        if (document.readyState === 'loading') {
-            document.addEventListener('DOMContentLoaded', applyNow);
-        } else {
-            applyNow();
+        if (!pending) {
+            done.add(element);
         }
 
-        // Экспорт для использования
-        window.i18nPreloader = { getString, strings };
+        Object.keys(ATTRIBUTES).forEach(attr => {
+            const attrKey = element.getAttribute(attr);
+            const translation = attrKey && getString(attrKey);
+            if (translation && translation !== attrKey) {
+                ATTRIBUTES[attr](element, translation);
+                count++;
+            }
+        });
+    }
+
+    function translateTree(node) {
+        if (node.nodeType === Node.TEXT_NODE) {
+            if (node.parentElement && node.parentElement.matches(SELECTOR)) {
+                translateElement(node.parentElement);
+            }
+            return;
+        }
+        if (node.nodeType !== Node.ELEMENT_NODE) {
+            return;
+        }
+        if (node.matches(SELECTOR)) {
+            translateElement(node);
+        }
+        node.querySelectorAll(SELECTOR).forEach(translateElement);
+    }
+
+    // Элементы переводятся по мере добавления парсером
+    const observer = new MutationObserver(mutations => {
+        mutations.forEach(mutation => mutation.addedNodes.forEach(translateTree));
+    });
+    observer.observe(document.documentElement, { childList: true, subtree: true });
+
+    function finish() {
+        observer.disconnect();
+        translateTree(document.documentElement);
+        console.log('[i18n-preloader] Applied', count, 'critical translations');
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', finish);
     } else {
-        console.error('[i18n-preloader] Failed to load JSON:', xhr.status);
+        finish();
     }
+
+    // Экспорт для использования
+    window.i18nPreloader = { getString, strings };
 })();
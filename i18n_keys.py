@@ -0,0 +1,80 @@
+"""
+Shared i18n key allocation for extract_text_content.py and create_i18n_structure.py
+"""
+import json
+from pathlib import Path
+
+
+class KeyAllocator:
+    """Assign unique keys in constant time, keeping keys stable across runs
+
+    Collisions get a numeric suffix (base, base_1, base_2, ...). Instead of
+    probing from 1 every time, the next free suffix of each base is kept in
+    a table, so thousands of strings sharing a truncated prefix stay linear.
+
+    With a registry (text -> key from earlier runs), texts that are
+    still present get their old key back via reserve(); only new texts go
+    through suffix allocation, so adding content does not renumber others.
+    Keys of texts that disappeared stay in the registry as tombstones and
+    are never handed to a different text, so existing translations for a
+    retired key cannot attach to new content (the text gets its key back
+    if it reappears). The registry therefore only grows.
+
+    Keys are unique across all categories and do not depend on them: when
+    a text moves to another category it keeps its key under the new
+    category prefix (e.g. buttons.love -> other.love), and pages tagged
+    with the old path must be re-run through the replacement script.
+    """
+
+    def __init__(self, previous=None):
+        self.previous = dict(previous or {})
+        self.assigned = {}
+        # Previous keys (including tombstones) are never allocated to new texts
+        self.used = set(self.previous.values())
+        self.pinned = set()
+        self.next_suffix = {}
+
+    @classmethod
+    def from_registry(cls, registry_path):
+        """Create an allocator seeded from a registry file, if it exists"""
+        try:
+            with open(registry_path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def reserve(self, texts):
+        """Pin the previous run's keys for every text that is still present"""
+        for text in texts:
+            key = self.previous.get(text)
+            if key is not None and key not in self.pinned and text not in self.assigned:
+                self.pinned.add(key)
+                self.assigned[text] = key
+
+    def allocate(self, base, text):
+        """Return the key for text, deriving a new one from base if needed"""
+        key = self.assigned.get(text)
+        if key is not None:
+            return key
+
+        key = base
+        if key in self.used:
+            suffix = self.next_suffix.get(base, 1)
+            key = f"{base}_{suffix}"
+            while key in self.used:
+                suffix += 1
+                key = f"{base}_{suffix}"
+            self.next_suffix[base] = suffix + 1
+
+        self.used.add(key)
+        self.assigned[text] = key
+        return key
+
+    def save_registry(self, registry_path):
+        """Write text -> key for every text allocated in this run plus the tombstones"""
+        registry = {text: key for text, key in self.previous.items() if text not in self.assigned}
+        registry.update(self.assigned)
+        registry_path = Path(registry_path)
+        with open(registry_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(registry.items(), key=lambda item: item[1])),
+                      f, ensure_ascii=False, indent=2)
@@ -0,0 +1,269 @@
+"""
+Shared catalog output for extract_text_content.py and create_i18n_structure.py
+
+The readable indent=2 source files are always written as before. A
+production build additionally writes minified copies into a separate
+output directory (i18n_dist/ by default), each with precompressed .gz/.br
+siblings so a static server can send them without compressing on every
+request (brotli is optional; without the package only .gz is written).
+Keys can optionally be replaced by short aliases; the alias -> key map is
+written next to the sources as *.keymap.json for debugging and is not
+deployed. Every artifact is listed in a size report; compressed sizes of
+files that are not compressed anyway are only measured on request.
+
+is_locale_copy() recognises the translated copies of prerender_locales.py,
+which the source tools must not read as pages.
+
+write_hashed_catalogs() publishes content-hashed copies of the deployed
+catalogs (the files i18n-loader.js fetches) with a manifest and optional
+deltas, one version per catalog.
+"""
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PRODUCTION_DIR_NAME = 'i18n_dist'
+KEY_MAP_SUFFIX = '.keymap.json'
+ALIAS_ALPHABET = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Locale code -> directory of its pre-rendered copies (the paths in lang-switcher.js)
+LOCALE_DIRS = {'en': 'en', 'zh-TW': 'zh-tw'}
+# Locale code -> deployed catalog fetched by i18n-loader.js (translated, in the site root)
+LOCALE_CATALOGS = {'en': 'i18n_categorized.json', 'zh-TW': 'i18n_categorized_zh-tw.json'}
+
+# Content-hashed catalogs (see write_hashed_catalogs) and their manifest
+HASHED_MANIFEST_FILE = 'i18n-manifest.json'
+HASHED_MANIFEST_VERSION = 2
+HASHED_HISTORY = 3
+# Hashed catalogs and deltas (with .gz/.br siblings); other files in the directory are kept
+HASHED_FILE_RE = re.compile(r'^i18n_[\w-]+\.[0-9a-f]{10}(?:-[0-9a-f]{10}\.delta)?\.json(?:\.gz|\.br)?$')
+# prerender_locales.py marks every copy with <html data-i18n-locale>
+_LOCALE_COPY_RE = re.compile(rb'<html\b[^>]*\sdata-i18n-locale\b', re.IGNORECASE)
+LOCALE_COPY_SCAN_BYTES = 64 * 1024
+
+
+def is_locale_copy(path, root):
+    """True for a page written by prerender_locales.py
+
+    That is any page in a locale directory directly under root, or any page
+    whose <html> tag carries data-i18n-locale (copies rendered elsewhere).
+    """
+    path = Path(path)
+    parts = path.relative_to(root).parts
+    if len(parts) > 1 and parts[0] in LOCALE_DIRS.values():
+        return True
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(LOCALE_COPY_SCAN_BYTES)
+    except OSError:
+        return False
+    return _LOCALE_COPY_RE.search(head) is not None
+
+
+def dump_json(data, production=False):
+    """Readable JSON for the sources, minified JSON for production"""
+    if production:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def short_alias(index):
+    """0 -> a, 51 -> Z, 52 -> aa, ... (always a valid JS identifier)"""
+    alias = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, len(ALIAS_ALPHABET))
+        alias = ALIAS_ALPHABET[rest] + alias
+    return alias
+
+
+def alias_keys(obj, path='', key_map=None):
+    """Replace every object key with a short alias, in sorted key order per object
+
+    Returns (aliased copy, {aliased dotted path: original dotted path}).
+    """
+    if key_map is None:
+        key_map = {}
+    if not isinstance(obj, dict):
+        return obj, key_map
+
+    aliased = {}
+    for index, key in enumerate(sorted(obj)):
+        alias = short_alias(index)
+        alias_path = f"{path}.{alias}" if path else alias
+        key_map[alias_path] = f"{key_map[path]}.{key}" if path else key
+        aliased[alias], _ = alias_keys(obj[key], alias_path, key_map)
+    return aliased, key_map
+
+
+def key_map_path(path):
+    """text_strings.json -> text_strings.keymap.json"""
+    path = Path(path)
+    return path.with_name(path.name.rpartition('.')[0] + KEY_MAP_SUFFIX)
+
+
+def gzip_bytes(data):
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=11) if brotli is not None else None
+
+
+class ArtifactWriter:
+    """Write build artifacts and collect their sizes for the report
+
+    Files are only rewritten when their bytes change. write(compress=True)
+    also writes .gz/.br siblings; with measure=True the compressed sizes of
+    the other artifacts are computed for the report as well.
+    """
+
+    def __init__(self, measure=False):
+        self.measure = measure
+        self.rows = []
+
+    def write(self, path, text, compress=False, debug=False):
+        """Write text (or bytes) to path; debug artifacts are never deployed"""
+        path = Path(path)
+        data = text.encode('utf-8') if isinstance(text, str) else text
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_bytes(path, data)
+
+        gz_size = br_size = None
+        if compress or self.measure:
+            gz_data = gzip_bytes(data)
+            br_data = brotli_bytes(data)
+            gz_size = len(gz_data)
+            br_size = len(br_data) if br_data is not None else None
+            if compress:
+                self._write_bytes(path.with_name(path.name + '.gz'), gz_data)
+                br_path = path.with_name(path.name + '.br')
+                if br_data is not None:
+                    self._write_bytes(br_path, br_data)
+                else:
+                    # Without brotli a stale .br would be served instead of the new content
+                    br_path.unlink(missing_ok=True)
+
+        self.rows.append((path, len(data), gz_size, br_size, compress, debug))
+
+    @staticmethod
+    def _write_bytes(path, data):
+        try:
+            if path.read_bytes() == data:
+                return
+        except OSError:
+            pass
+        path.write_bytes(data)
+
+    def print_report(self):
+        """Raw, gzip and brotli size of every artifact written"""
+        def size(value):
+            return f"{value / 1024:7.1f} KB" if value is not None else f"{'-':>10}"
+
+        print(f"\nArtifact sizes (* = .gz/.br written next to the file):")
+        print(f"  {'raw':>10} {'gzip':>10} {'brotli':>10}  file")
+        for path, raw, gz, br, compressed, debug in self.rows:
+            note = '  (debug only, do not deploy)' if debug else ''
+            print(f"  {size(raw)} {size(gz)} {size(br)} {'*' if compressed else ' '} {path}{note}")
+        if brotli is None and any(row[2] is not None for row in self.rows):
+            print("  (brotli package not installed: no .br files)")
+
+
+def content_hash(data):
+    """Short SHA-256 of file contents, used in hashed file names"""
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def hashed_name(file_name, digest):
+    """i18n_categorized.json -> i18n_categorized.<digest>.json"""
+    stem, dot, ext = file_name.rpartition('.')
+    return f"{stem}.{digest}.{ext}"
+
+
+def flat_strings(catalog):
+    """{'category.key': value} of a categorized catalog ({'strings': {category: {key: value}}})"""
+    return {f"{category}.{key}": value
+            for category, strings in catalog.get('strings', {}).items()
+            for key, value in strings.items()}
+
+
+def catalog_delta(old_flat, new_flat):
+    """Changes between two flat catalogs: keys to set and keys to delete"""
+    return {
+        'set': {key: value for key, value in new_flat.items() if old_flat.get(key) != value},
+        'delete': sorted(old_flat.keys() - new_flat.keys()),
+    }
+
+
+def write_hashed_catalogs(out_dir, catalogs, delta=False, writer=None, compress=False):
+    """Write content-hashed copies of catalogs and update the manifest
+
+    catalogs maps the deployed file name (as fetched by i18n-loader.js) to
+    the parsed catalog. Each catalog is versioned on its own by the hash of
+    its minified JSON, so it can be cached forever; pages only revalidate
+    the small manifest. With delta=True a delta from a catalog's previous
+    version (flat keys to set/delete) is written too. Catalogs that are not
+    passed keep their manifest entry; files of versions older than
+    HASHED_HISTORY are removed. With a writer (ArtifactWriter) the files
+    appear in its size report; compress=True also writes .gz/.br siblings.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    writer = writer or ArtifactWriter()
+    manifest_path = out_dir / HASHED_MANIFEST_FILE
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    entries = dict(previous.get('catalogs', {})) if previous.get('version') == HASHED_MANIFEST_VERSION else {}
+
+    for file_name, catalog in catalogs.items():
+        data = dump_json(catalog, production=True).encode('utf-8')
+        version = content_hash(data)
+        hashed_file = hashed_name(file_name, version)
+        writer.write(out_dir / hashed_file, data, compress=compress)
+
+        old = entries.get(file_name, {})
+        history = [item for item in old.get('history', []) if item['version'] != version]
+        history = [{'version': version, 'file': hashed_file}] + history[:HASHED_HISTORY - 1]
+
+        # Deltas lead to the current version, so they survive reruns without changes
+        deltas = dict(old.get('deltas', {})) if old.get('version') == version else {}
+        if delta and old.get('version') and old['version'] != version:
+            try:
+                with open(out_dir / old['file'], 'r', encoding='utf-8') as f:
+                    old_flat = flat_strings(json.load(f))
+            except (OSError, KeyError, ValueError):
+                old_flat = None
+            if old_flat is not None:
+                delta_file = f"{file_name.rpartition('.')[0]}.{old['version']}-{version}.delta.json"
+                writer.write(out_dir / delta_file,
+                             json.dumps({'from': old['version'], 'to': version,
+                                         **catalog_delta(old_flat, flat_strings(catalog))},
+                                        ensure_ascii=False, separators=(',', ':')), compress=compress)
+                deltas[old['version']] = delta_file
+
+        entries[file_name] = {'version': version, 'file': hashed_file, 'deltas': deltas, 'history': history}
+
+    manifest = {'version': HASHED_MANIFEST_VERSION, 'catalogs': dict(sorted(entries.items()))}
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    # Remove files of versions that dropped out of the history
+    keep = set()
+    for entry in entries.values():
+        keep.update(entry['deltas'].values())
+        keep.update(item['file'] for item in entry['history'])
+    for path in out_dir.glob('i18n_*.json*'):
+        if HASHED_FILE_RE.match(path.name) and path.name.removesuffix('.gz').removesuffix('.br') not in keep:
+            path.unlink()
+
+    return manifest
@@ -9,17 +9,22 @@
         'en': {
             name: 'English',
             flag: '🇺🇸',
-            jsonFile: '/i18n_categorized.json'
+            jsonFile: '/i18n_categorized.json',
+            path: '/en/'
         },
         'zh-TW': {
             name: '繁體中文',
             flag: '🇹🇼',
-            jsonFile: '/i18n_categorized_zh-tw.json'
+            jsonFile: '/i18n_categorized_zh-tw.json',
+            path: '/zh-tw/'
         }
     };
 
+    // Язык предварительно отрендеренной страницы (prerender_locales.py), если есть
+    const prerenderedLang = document.documentElement.getAttribute('data-i18n-locale');
+
     // Получить текущий язык из localStorage или установить по умолчанию 'en'
-    let currentLang = localStorage.getItem('preferred-language') || 'en';
+    let currentLang = prerenderedLang || localStorage.getItem('preferred-language') || 'en';
     let initialized = false;
 
     // Обновить UI переключателя
@@ -57,6 +62,17 @@
         currentLang = lang;
         localStorage.setItem('preferred-language', lang);
 
+        // Отрендеренная страница - перейти на ту же страницу в каталоге другого языка
+        if (prerenderedLang) {
+            const currentPath = languages[prerenderedLang].path;
+            const pathname = location.pathname.startsWith(currentPath)
+                ? languages[lang].path + location.pathname.slice(currentPath.length)
+                : languages[lang].path;
+            console.log(`[lang-switcher] Switching to ${lang}, opening ${pathname}`);
+            location.href = pathname + location.search + location.hash;
+            return;
+        }
+
         console.log(`[lang-switcher] Switching to ${lang}, reloading page...`);
 
         // Перезагрузка страницы для применения нового языка
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batched machine-translation backends for translate_with_ai.py
+
+A backend translates a list of strings in one request. BatchTranslator
+splits the work into batches bounded by string count and characters and
+dispatches them as asyncio tasks, with a semaphore capping the requests in
+flight, a request rate limit, and retries with exponential backoff.
+Rejected requests (HTTP 4xx other than 429) are not retried. If batches
+still fail, IncompleteTranslation carries the translations of the batches
+that succeeded so callers can keep them.
+Backends may provide an async translate_batch_async(); blocking
+translate_batch() calls run in worker threads.
+
+Backends:
+  stub  - local, deterministic; no network (for tests and dry runs)
+  http  - POST {"source", "target", "texts": [...]} to an endpoint that
+          answers {"translations": [...]}; `python mt_backend.py serve`
+          runs a stand-in server speaking this protocol
+"""
+
+import asyncio
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_BATCH_CHARS = 5000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_DELAY = 0.5
+
+
+class BackendError(Exception):
+    """A batch request failed and may be retried"""
+
+
+class RequestRejected(Exception):
+    """The service rejected a batch request; retrying it would fail again"""
+
+
+class IncompleteTranslation(Exception):
+    """Some batches failed; translations holds {text: translation} of the others"""
+
+    def __init__(self, translations, errors):
+        super().__init__(f"{len(errors)} batch(es) failed: {errors[0]}")
+        self.translations = translations
+        self.errors = errors
+
+
+class StubBackend:
+    """Deterministic local backend
+
+    translate(text) produces each translation (default: "[target] text").
+    latency simulates request time; fail_every makes every Nth request
+    fail once so retry handling can be exercised.
+    """
+
+    name = 'stub'
+
+    def __init__(self, translate=None, latency=0.0, fail_every=0):
+        self.translate = translate
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def translate_batch(self, texts, source, target):
+        with self.lock:
+            self.requests += 1
+            request = self.requests
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and request % self.fail_every == 0:
+            raise BackendError(f"stub failure on request {request}")
+        if self.translate:
+            return [self.translate(text) for text in texts]
+        return [f"[{target}] {text}" for text in texts]
+
+
+class HTTPBackend:
+    """JSON-over-HTTP backend (see module docstring for the protocol)"""
+
+    name = 'http'
+
+    def __init__(self, endpoint, timeout=30, headers=None):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+
+    def translate_batch(self, texts, source, target):
+        body = json.dumps({'source': source, 'target': target, 'texts': texts},
+                          ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(self.endpoint, data=body, headers=self.headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                translations = json.load(response)['translations']
+        except urllib.error.HTTPError as e:
+            # 429 (rate limited) and 5xx are temporary, other client errors are not
+            if 400 <= e.code < 500 and e.code != 429:
+                raise RequestRejected(f"{self.endpoint}: {e}") from e
+            raise BackendError(f"{self.endpoint}: {e}") from e
+        except (OSError, ValueError, KeyError) as e:
+            raise BackendError(f"{self.endpoint}: {e}") from e
+        if len(translations) != len(texts):
+            raise BackendError(f"{self.endpoint}: expected {len(texts)} translations, got {len(translations)}")
+        return translations
+
+
+class RateLimiter:
+    """Allow at most `rate` requests per second within an event loop"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        start = max(now, self.next_time)
+        self.next_time = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def make_batches(texts, max_size=DEFAULT_BATCH_SIZE, max_chars=DEFAULT_BATCH_CHARS):
+    """Split texts into batches of at most max_size strings and max_chars characters
+
+    A single string longer than max_chars gets a batch of its own.
+    """
+    batches = []
+    batch = []
+    chars = 0
+    for text in texts:
+        if batch and (len(batch) >= max_size or chars + len(text) > max_chars):
+            batches.append(batch)
+            batch = []
+            chars = 0
+        batch.append(text)
+        chars += len(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class BatchTranslator:
+    """Run a backend over many strings with batching, concurrency, rate limit and retries"""
+
+    def __init__(self, backend, source='ko', target='en', batch_size=DEFAULT_BATCH_SIZE,
+                 batch_chars=DEFAULT_BATCH_CHARS, concurrency=DEFAULT_CONCURRENCY,
+                 rate=None, retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+        self.backend = backend
+        self.source = source
+        self.target = target
+        self.batch_size = batch_size
+        self.batch_chars = batch_chars
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.stats = {'strings': 0, 'chars': 0, 'batches': 0, 'retries': 0, 'seconds': 0.0, 'fill': 0.0}
+
+    async def _request(self, batch):
+        if hasattr(self.backend, 'translate_batch_async'):
+            return await self.backend.translate_batch_async(batch, self.source, self.target)
+        return await asyncio.to_thread(self.backend.translate_batch, batch, self.source, self.target)
+
+    async def _run_batch(self, semaphore, batch):
+        async with semaphore:
+            for attempt in range(self.retries + 1):
+                await self.rate_limiter.wait()
+                try:
+                    return await self._request(batch)
+                except BackendError:
+                    if attempt == self.retries:
+                        raise
+                    self.stats['retries'] += 1
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    async def translate_many_async(self, texts):
+        """Translate texts, returning translations in the same order
+
+        If a batch still fails after its retries (or is rejected), the other
+        batches run to completion and IncompleteTranslation is raised with
+        their translations.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        batches = make_batches(texts, self.batch_size, self.batch_chars)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self._run_batch(semaphore, batch) for batch in batches),
+                                       return_exceptions=True)
+        self.stats['seconds'] += time.perf_counter() - start
+        self.stats['strings'] += len(texts)
+        self.stats['chars'] += sum(len(text) for text in texts)
+        self.stats['batches'] += len(batches)
+        # A batch is full when either limit (strings or characters) is reached
+        self.stats['fill'] += sum(min(1.0, max(len(batch) / self.batch_size,
+                                               sum(map(len, batch)) / self.batch_chars))
+                                  for batch in batches)
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            translations = {}
+            for batch, result in zip(batches, results):
+                if not isinstance(result, BaseException):
+                    translations.update(zip(batch, result))
+            raise IncompleteTranslation(translations, errors)
+        return [translation for batch in results for translation in batch]
+
+    def translate_many(self, texts):
+        """Blocking wrapper around translate_many_async()"""
+        return asyncio.run(self.translate_many_async(texts))
+
+    def summary(self):
+        """One-line throughput and batch efficiency report"""
+        stats = self.stats
+        if not stats['batches']:
+            return f"{self.backend.name}: nothing to translate"
+        per_second = stats['strings'] / stats['seconds'] if stats['seconds'] else float('inf')
+        fill = stats['fill'] / stats['batches']
+        return (f"{self.backend.name}: {stats['strings']} strings in {stats['batches']} batches "
+                f"({stats['retries']} retries), {per_second:.1f} strings/sec, "
+                f"batch fill {fill:.0%} ({stats['strings'] / stats['batches']:.1f} strings, "
+                f"{stats['chars'] / stats['batches']:.0f} chars per batch)")
+
+
+def make_backend(name, endpoint=None, translate=None):
+    """Backend factory used by the command-line scripts"""
+    if name == 'stub':
+        return StubBackend(translate)
+    if name == 'http':
+        if not endpoint:
+            raise ValueError('--endpoint is required for the http backend')
+        return HTTPBackend(endpoint)
+    raise ValueError(f"unknown backend: {name}")
+
+
+def serve(backend, host='127.0.0.1', port=8765):
+    """Serve a backend over the JSON protocol (local stand-in for a real MT service)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                request = json.loads(self.rfile.read(length))
+                translations = backend.translate_batch(request['texts'], request.get('source'),
+                                                       request.get('target'))
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            except BackendError as e:
+                self.send_error(503, str(e))
+                return
+            body = json.dumps({'translations': translations}, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"🌐 Stand-in MT server on http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the local stand-in MT server')
+    parser.add_argument('command', choices=['serve'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per request')
+    parser.add_argument('--fail-every', type=int, default=0, help='Fail every Nth request')
+    args = parser.parse_args()
+
+    serve(StubBackend(latency=args.latency, fail_every=args.fail_every), args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
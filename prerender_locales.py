@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Pre-render translated copies of the site for each locale (/en/, /zh-tw/)
+
+The copies are written outside the mirror (<root>-locales/ next to it by
+default) so the source tools never read them back as pages; deploy them
+by copying the locale directories into the web root.
+
+Uses the data-i18n* attributes inserted by replace_hardcoded_strings_v2.py:
+every page is parsed once and each locale's copy is produced by splicing
+the translations into the original text, so pages ship already translated
+and need neither the catalog fetch nor i18n-loader.js. In each copy:
+
+- data-i18n text and data-i18n-{placeholder,title,alt,aria} attributes are
+  translated the way i18n-loader.js does it at runtime
+- <html lang> is set and data-i18n-locale is added (read by lang-switcher.js)
+- <base href> points at the page's original directory so relative assets
+  keep resolving; links to other pages, and fragment-only or query-only
+  links (which would otherwise resolve against <base>), are rewritten to
+  stay inside the locale's tree
+- the runtime i18n script tags and the inline critical translations
+  (replace_hardcoded_strings_v2.py --inline-critical) are removed
+
+Every copy is checked for links that still lead out of its locale tree.
+A manifest remembers each page's source hash, the keys it uses and the
+pages it links to; a page is re-rendered only if its source, the values of
+those keys, or the existence of its link targets changed.
+"""
+
+import os
+import io
+import re
+import sys
+import json
+import time
+import hashlib
+import posixpath
+import html as html_lib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout, redirect_stderr
+from pathlib import Path
+from urllib.parse import unquote, urljoin, urlsplit
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+from i18n_output import LOCALE_DIRS, is_locale_copy
+from replace_hardcoded_strings_v2 import (CRITICAL_SCRIPT_ID, I18N_ATTRIBUTES, atomic_write_text, flatten_dict,
+                                          scan_start_tag, tag_offset)
+
+# Locale code -> output directory and catalog (the same as in lang-switcher.js)
+LOCALES = {
+    'en': {'dir': LOCALE_DIRS['en'], 'catalog': 'i18n_categorized.json'},
+    'zh-TW': {'dir': LOCALE_DIRS['zh-TW'], 'catalog': 'i18n_categorized_zh-tw.json'},
+}
+OUT_DIR_SUFFIX = '-locales'
+
+MANIFEST_FILE_NAME = '.prerender_manifest.json'
+PRERENDER_VERSION = 3
+
+# Scripts that translate the page at runtime; not needed in pre-rendered copies
+RUNTIME_SCRIPTS = ('i18n-loader.js', 'i18n-preloader.js')
+
+# Directories that are never part of the mirror
+EXCLUDE_DIRS = {'.git', '.i18n_backups', 'i18n_build', 'node_modules', '__pycache__'}
+
+# data-i18n-* attribute -> translated attribute
+ATTRIBUTE_TARGETS = {data_attr: attr for attr, data_attr, _, _ in I18N_ATTRIBUTES}
+
+# <a href> and <base href> in rendered output, for the link check
+_COMMENT_RE = re.compile(r'<!--.*?-->|<!\[CDATA\[.*?\]\]>', re.DOTALL)
+_LINK_RE = re.compile(r'''<(a|base)\s[^>]*?\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.IGNORECASE)
+
+
+def _quote(value):
+    return '"' + html_lib.escape(value, quote=True) + '"'
+
+
+def _attr_slot(span, kind, *args):
+    """Slot replacing an attribute value found by scan_start_tag()"""
+    start, end, prefix = span
+    return (start, end, kind, prefix) + args
+
+
+def _text_node_span(content, node, parent_end, line_starts):
+    """Span of a text node in the source, or None if it cannot be located exactly"""
+    previous, following = node.previous_sibling, node.next_sibling
+    start = end = None
+    if previous is None:
+        start = parent_end
+    if isinstance(following, Tag) and following.sourceline is not None:
+        end = tag_offset(following, line_starts)
+        if start is None:
+            start = content.rfind('>', 0, end) + 1
+    elif start is not None:
+        end = content.find('<', start)
+    if start is None or end is None or end < start:
+        return None
+    if html_lib.unescape(content[start:end]) != str(node):
+        return None
+    return start, end
+
+
+def _text_slot(content, element, tag_end, key, line_starts):
+    """Slot replacing an element's text, following smartReplace() in i18n-loader.js
+
+    Without child elements the whole text is replaced; otherwise only the
+    first non-empty direct text node, keeping its surrounding whitespace.
+    """
+    if not any(isinstance(child, Tag) for child in element.contents):
+        if any(isinstance(child, Comment) for child in element.contents):
+            return None
+        end = content.find('<', tag_end)
+        if end < 0 or html_lib.unescape(content[tag_end:end]) != element.get_text():
+            return None
+        return (tag_end, end, 'text', key, '', '')
+
+    for child in element.contents:
+        if isinstance(child, NavigableString) and not isinstance(child, Comment) and child.strip():
+            span = _text_node_span(content, child, tag_end, line_starts)
+            if span is None:
+                return None
+            raw = content[span[0]:span[1]]
+            stripped = raw.strip()
+            lead = raw[:len(raw) - len(raw.lstrip())]
+            trail = raw[len(lead) + len(stripped):]
+            return (span[0], span[1], 'text', key, lead, trail)
+    return None
+
+
+def page_url(rel_path):
+    """Site-relative URL of a page: dir/index.html -> dir/"""
+    return rel_path[:-len('index.html')] if posixpath.basename(rel_path) == 'index.html' else rel_path
+
+
+def link_target(href, rel_path):
+    """(target page path, URL + query/fragment) an <a href> points to, or None
+
+    Fragment-only and query-only links ("#", "#top", "?page=2") point to the
+    page itself: with a <base> element they would otherwise resolve against
+    the page's directory in the original tree.
+    """
+    parts = urlsplit(href)
+    if parts.scheme or parts.netloc:
+        return None
+    path = parts.path
+    suffix = href[len(path):]
+    if not path:
+        return rel_path, page_url(rel_path) + suffix
+    if path.startswith('/'):
+        target = path.lstrip('/')
+    else:
+        # Like a browser, '..' above the site root stays at the root
+        target = posixpath.normpath(posixpath.join('/', posixpath.dirname(rel_path), path)).lstrip('/')
+    if path.endswith('/') or posixpath.basename(path) in ('.', '..') or target == '':
+        target = posixpath.join(target, 'index.html') if target else 'index.html'
+        url = target[:-len('index.html')]
+    else:
+        url = target
+    return unquote(target), url + suffix
+
+
+def leaked_links(output, rel_path, locale_dir, pages):
+    """Links of a rendered copy that lead to a mirror page outside the locale's tree"""
+    base = '/' + page_url(rel_path)
+    leaks = []
+    for match in _LINK_RE.finditer(_COMMENT_RE.sub('', output)):
+        href = html_lib.unescape(next(value for value in match.groups()[1:] if value is not None))
+        if match.group(1).lower() == 'base':
+            base = urljoin(base, href)
+            continue
+        parts = urlsplit(urljoin(base, href))
+        if parts.scheme or parts.netloc:
+            continue
+        path = unquote(parts.path)
+        if path.startswith(f"/{locale_dir}/"):
+            continue
+        target = path.lstrip('/')
+        if target in pages or posixpath.join(target, 'index.html') in pages:
+            leaks.append(href)
+    return leaks
+
+
+def links_hash(targets, pages):
+    """Fingerprint of which of a page's link targets exist"""
+    existing = [target for target in targets if target in pages]
+    return hashlib.sha1('\n'.join(existing).encode('utf-8')).hexdigest()
+
+
+def analyze_page(content, rel_path, pages):
+    """Find every edit a locale copy of this page needs
+
+    Returns (slots, keys, targets): slots are (start, end, kind, ...) spans
+    of the original text that get locale-specific replacements, keys are the
+    catalog keys the page uses and targets the page paths it links to.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    line_starts = [0] + [m.end() for m in re.finditer('\n', content)]
+    page_dir = posixpath.dirname(rel_path)
+    slots = []
+    keys = set()
+    targets = set()
+    has_base = soup.find('base') is not None
+
+    for element in soup.find_all(True):
+        if element.sourceline is None:
+            continue
+        offset = tag_offset(element, line_starts)
+        attrs, insert_pos, tag_end = scan_start_tag(content, offset)
+        name = element.name
+
+        if name == 'html':
+            if 'lang' in attrs:
+                slots.append(_attr_slot(attrs['lang'], 'lang'))
+            else:
+                slots.append((insert_pos, insert_pos, 'insert_lang'))
+            slots.append((insert_pos, insert_pos, 'insert_locale'))
+        elif name == 'head' and not has_base:
+            slots.append((tag_end, tag_end, 'base', page_dir))
+        elif name == 'script' and (element.get('id') == CRITICAL_SCRIPT_ID
+                                   or any(script in element.get('src', '') for script in RUNTIME_SCRIPTS)):
+            close = content.find('</script>', tag_end)
+            if close >= 0:
+                slots.append((offset, close + len('</script>'), 'remove'))
+            continue
+        elif name == 'a' and 'href' in attrs:
+            link = link_target(element['href'], rel_path)
+            if link is not None:
+                targets.add(link[0])
+                if link[0] in pages:
+                    slots.append(_attr_slot(attrs['href'], 'link', link[1]))
+
+        key = element.get('data-i18n')
+        if key:
+            keys.add(key)
+            slot = _text_slot(content, element, tag_end, key, line_starts)
+            if slot:
+                slots.append(slot)
+
+        for data_attr, attr in ATTRIBUTE_TARGETS.items():
+            key = element.get(data_attr)
+            if not key:
+                continue
+            keys.add(key)
+            if attr in attrs:
+                slots.append(_attr_slot(attrs[attr], 'attr', key))
+            else:
+                slots.append((insert_pos, insert_pos, 'insert_attr', key, attr))
+
+    slots.sort(key=lambda slot: (slot[0], slot[1]))
+    return slots, sorted(keys), sorted(targets)
+
+
+def render_page(content, slots, locale, strings):
+    """Build one locale's copy of a page from its analyzed slots"""
+    locale_dir = LOCALES[locale]['dir']
+    parts = []
+    last = 0
+    for slot in slots:
+        start, end, kind = slot[:3]
+        if kind == 'text':
+            translation = strings.get(slot[3])
+            if not translation:
+                continue
+            replacement = slot[4] + html_lib.escape(translation, quote=False) + slot[5]
+        elif kind == 'attr':
+            translation = strings.get(slot[4])
+            if not translation:
+                continue
+            replacement = slot[3] + _quote(translation)
+        elif kind == 'insert_attr':
+            translation = strings.get(slot[3])
+            if not translation:
+                continue
+            replacement = f' {slot[4]}={_quote(translation)}'
+        elif kind == 'lang':
+            replacement = slot[3] + _quote(locale)
+        elif kind == 'insert_lang':
+            replacement = f' lang={_quote(locale)}'
+        elif kind == 'insert_locale':
+            replacement = f' data-i18n-locale={_quote(locale)}'
+        elif kind == 'base':
+            base = f"/{slot[3]}/" if slot[3] else '/'
+            replacement = f'<base href={_quote(base)}>'
+        elif kind == 'link':
+            replacement = slot[3] + _quote(f"/{locale_dir}/{slot[4]}")
+        else:
+            replacement = ''
+        if start < last:
+            continue
+        parts.append(content[last:start])
+        parts.append(replacement)
+        last = end
+    parts.append(content[last:])
+    return ''.join(parts)
+
+
+def render_file(root_dir, out_root, rel_path, locales, catalogs, pages):
+    """Render the given locales of one page; returns (keys, targets, written, stats)
+
+    stats['leaks'] lists links of the copies that leave their locale tree.
+    """
+    started = time.perf_counter()
+    with open(Path(root_dir) / rel_path, 'r', encoding='utf-8', newline='') as f:
+        content = f.read()
+    slots, keys, targets = analyze_page(content, rel_path, pages)
+    parsed = time.perf_counter()
+
+    written = 0
+    leaks = []
+    for locale in locales:
+        output = render_page(content, slots, locale, catalogs[locale])
+        leaks.extend(f"{locale}: {href}" for href in leaked_links(output, rel_path, LOCALES[locale]['dir'], pages))
+        output_path = Path(out_root) / LOCALES[locale]['dir'] / rel_path
+        try:
+            with open(output_path, 'r', encoding='utf-8', newline='') as f:
+                if f.read() == output:
+                    continue
+        except OSError:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(output_path, output)
+        written += 1
+
+    return keys, targets, written, {'parse': parsed - started, 'render': time.perf_counter() - parsed,
+                                    'leaks': leaks}
+
+
+# Worker processes receive the catalogs once, through the pool initializer
+_worker_context = None
+
+
+def _init_worker(context):
+    global _worker_context
+    _worker_context = context
+
+
+def _render_task(task):
+    rel_path, locales = task
+    context = _worker_context
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            return render_file(context['root'], context['out'], rel_path, locales,
+                               context['catalogs'], context['pages'])
+    except Exception as e:
+        return None, None, 0, {'error': str(e)}
+
+
+def iter_rendered(tasks, context, jobs):
+    """Render (rel_path, locales) tasks, yielding (rel_path, keys, targets, written, stats) in order"""
+    if jobs <= 1:
+        _init_worker(context)
+        for task in tasks:
+            yield (task[0],) + _render_task(task)
+        return
+
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(context,)) as executor:
+        for task, result in zip(tasks, executor.map(_render_task, tasks, chunksize=chunksize)):
+            yield (task[0],) + result
+
+
+def find_pages(root_dir, out_root):
+    """Relative paths (posix) of every HTML page of the mirror, without locale copies"""
+    root_dir = Path(root_dir).resolve()
+    locale_dirs = {(Path(out_root).resolve() / config['dir']) for config in LOCALES.values()}
+    pages = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        current = Path(dirpath)
+        dirnames[:] = sorted(d for d in dirnames
+                             if d not in EXCLUDE_DIRS and not d.startswith('.')
+                             and (current / d) not in locale_dirs)
+        for filename in sorted(filenames):
+            if filename.endswith('.html') and not is_locale_copy(current / filename, root_dir):
+                pages.append((current / filename).relative_to(root_dir).as_posix())
+    return pages
+
+
+def values_hash(keys, strings):
+    """Fingerprint of the catalog values a page uses"""
+    digest = hashlib.sha1()
+    for key in keys:
+        digest.update(key.encode('utf-8') + b'\0' + (strings.get(key) or '').encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get('version') == PRERENDER_VERSION else {}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pre-render translated copies of every page for each locale')
+    parser.add_argument('--root', default=str(Path(__file__).parent), help='Mirror root directory')
+    parser.add_argument('--out', help=f'Where the locale directories go, outside the mirror '
+                                      f'(default: <root>{OUT_DIR_SUFFIX} next to it)')
+    parser.add_argument('--locales', help=f"Comma-separated subset of: {', '.join(LOCALES)}")
+    parser.add_argument('--catalog', action='append', default=[], metavar='LOCALE=PATH',
+                        help='Use another catalog for a locale (e.g. from build_translations.py)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Parallel worker processes')
+    parser.add_argument('--force', action='store_true', help='Re-render every page')
+    args = parser.parse_args()
+
+    root_dir = Path(args.root)
+    out_root = Path(args.out) if args.out else root_dir.resolve().with_name(root_dir.resolve().name + OUT_DIR_SUFFIX)
+    locales = args.locales.split(',') if args.locales else list(LOCALES)
+    unknown = [locale for locale in locales if locale not in LOCALES]
+    if unknown:
+        parser.error(f"unknown locale(s): {', '.join(unknown)}")
+
+    catalog_paths = {locale: root_dir / LOCALES[locale]['catalog'] for locale in locales}
+    for override in args.catalog:
+        locale, _, path = override.partition('=')
+        if locale not in catalog_paths or not path:
+            parser.error(f"bad --catalog {override}")
+        catalog_paths[locale] = Path(path)
+
+    start_time = time.perf_counter()
+    catalogs = {}
+    for locale, path in catalog_paths.items():
+        with open(path, 'r', encoding='utf-8') as f:
+            catalogs[locale] = flatten_dict(json.load(f).get('strings', {}))
+
+    pages = find_pages(root_dir, out_root)
+    page_set = set(pages)
+    manifest_path = out_root / MANIFEST_FILE_NAME
+    manifest = load_manifest(manifest_path)
+    previous = manifest.get('pages', {}) if not args.force else {}
+
+    # Decide per page which locales need rendering
+    tasks = []
+    entries = {}
+    for rel_path in pages:
+        source_hash = hashlib.sha1((root_dir / rel_path).read_bytes()).hexdigest()
+        entry = previous.get(rel_path)
+        # A page is reused only if its source and its links' targets are unchanged
+        if entry and entry['source'] == source_hash and entry['links'] == links_hash(entry['targets'], page_set):
+            needed = [locale for locale in locales
+                      if entry['locales'].get(locale) != values_hash(entry['keys'], catalogs[locale])
+                      or not (out_root / LOCALES[locale]['dir'] / rel_path).exists()]
+        else:
+            entry = {'source': source_hash, 'keys': [], 'targets': [], 'links': '', 'locales': {}}
+            needed = list(locales)
+        entries[rel_path] = entry
+        if needed:
+            tasks.append((rel_path, needed))
+
+    print(f"📄 {len(pages)} pages, {len(tasks)} to render ({', '.join(locales)})")
+
+    context = {'root': str(root_dir), 'out': str(out_root), 'catalogs': catalogs, 'pages': page_set}
+    written_total = 0
+    errors = 0
+    leaks = 0
+    for rel_path, keys, targets, written, stats in iter_rendered(tasks, context, args.jobs):
+        if keys is None:
+            errors += 1
+            entries.pop(rel_path)
+            print(f"  ✗ {rel_path}: {stats['error']}")
+            continue
+        for leak in stats['leaks']:
+            print(f"  ✗ {rel_path}: link leaves the locale tree ({leak})")
+        leaks += len(stats['leaks'])
+        written_total += written
+        entry = entries[rel_path]
+        entry['keys'] = keys
+        entry['targets'] = targets
+        entry['links'] = links_hash(targets, page_set)
+        for locale in locales:
+            entry['locales'][locale] = values_hash(keys, catalogs[locale])
+
+    manifest = {'version': PRERENDER_VERSION, 'pages': entries}
+    out_root.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1))
+
+    print(f"✅ Rendered {len(tasks)} pages ({written_total} files written, {errors} errors, "
+          f"{leaks} links leaving the locale tree) in {time.perf_counter() - start_time:.2f}s")
+    return 1 if errors or leaks else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,10 +7,57 @@ Preserves HTML formatting and styles
 import os
 import json
 import re
+import io
+import sys
+import time
+import gzip
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout, redirect_stderr
+from functools import lru_cache
 from pathlib import Path
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
+from i18n_output import is_locale_copy
 import html as html_lib
 
+# Атрибуты, которые переводятся: атрибут -> (data-атрибут, метка в логе, только для тега)
+I18N_ATTRIBUTES = (
+    ('placeholder', 'data-i18n-placeholder', 'placeholder', None),
+    ('title', 'data-i18n-title', 'title', None),
+    ('alt', 'data-i18n-alt', 'alt', 'img'),
+    ('aria-label', 'data-i18n-aria', 'aria-label', None),
+)
+
+# Теги, которые не обрабатываются
+SKIP_TAGS = {'script', 'style', 'noscript'}
+
+# Режимы записи: splice - вставка атрибутов в исходный текст,
+# serialize - полная пересборка документа через BeautifulSoup
+REWRITE_MODES = ('splice', 'serialize')
+
+# Хранилище резервных копий (относительно корня проекта)
+BACKUP_STORE_DIR = '.i18n_backups'
+
+# Критичные переводы (--inline-critical): каталоги локалей, встраиваемые в <head>
+CRITICAL_LOCALE_CATALOGS = {
+    'en': 'i18n_categorized.json',
+    'zh-TW': 'i18n_categorized_zh-tw.json',
+}
+# Ключи этих категорий и ключи внутри этих тегов всегда критичные
+CRITICAL_CATEGORIES = ('navigation', 'buttons')
+CRITICAL_CONTAINERS = ['header', 'nav']
+# Плюс первые N ключей документа (первый экран, hero)
+CRITICAL_FIRST_KEYS = 12
+CRITICAL_SCRIPT_ID = 'i18n-critical'
+CRITICAL_PRELOADER = '/i18n-preloader.js'
+
+# Разбор открывающего тега (как в токенизаторе HTML5): имя тега, затем
+# разделители и атрибуты со значениями в кавычках или без них
+_TAG_NAME_RE = re.compile(r'<[^\s/>]+')
+_TAG_ATTR_RE = re.compile(r'''[\s/]*(?:([^\s/>][^\s/>=]*)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]*))?)?''')
+
 # Загрузка JSON с переводами
 def load_i18n_json():
     """Загрузить структуру переводов из JSON"""
@@ -48,10 +95,17 @@ def create_reverse_map(flat_dict):
 
 # Очистка текста для сравнения
 def normalize_text(text):
-    """Нормализовать текст для сравнения"""
+    """Нормализовать текст для сравнения (с мемоизацией)"""
     if not text:
         return ""
 
+    # str() отвязывает NavigableString от дерева, чтобы кэш не держал весь документ
+    return _normalize_text_cached(str(text))
+
+@lru_cache(maxsize=65536)
+def _normalize_text_cached(text):
+    """Нормализация строки (кэшируется); вызывается через normalize_text"""
+
     # Убрать лишние пробелы
     text = ' '.join(text.split())
     # Убрать HTML entities
@@ -59,98 +113,656 @@ def normalize_text(text):
 
     return text.strip()
 
-# Обработка одного HTML файла с сохранением форматирования
-def process_html_file(file_path, reverse_map, dry_run=False):
-    """Обработать один HTML файл с сохранением оригинального форматирования"""
-    print(f"\n{'[DRY RUN] ' if dry_run else ''}Processing: {file_path}")
+# Быстрая предварительная проверка файлов по сырым байтам
+class CatalogPrefilter:
+    """Мультишаблонный поиск строк каталога в сырых байтах HTML
+
+    В исходном HTML строка может отличаться от нормализованной (пробелы,
+    переводы строк, сущности &amp; &#8217; и т.п.), поэтому для каждой строки
+    берется самый длинный фрагмент без пробелов и символов, которые обычно
+    кодируются сущностями. Все фрагменты объединяются в одно регулярное
+    выражение по bytes. Любой другой символ тоже можно записать сущностью
+    (&#233;, &eacute;, в т.ч. дважды экранированной &amp;eacute;), поэтому
+    файл без фрагментов пропускается, только если все его сущности
+    раскрываются в пробелы и символы из _UNSAFE_RE. Тогда в нем нет
+    совпадений (для файлов в UTF-8) и полный разбор DOM можно пропустить.
+    """
+
+    _UNSAFE_RE = re.compile('[\\s&<>"\'\u2018\u2019\u201c\u201d\u2013\u2014\u2026\xa0]+')
+    # Ссылка на символ, в т.ч. после &amp; (normalize_text раскрывает сущности повторно)
+    _ENTITY_RE = re.compile(rb'&(?:amp;)?(#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[A-Za-z][A-Za-z0-9]*;?)')
+
+    def __init__(self, texts):
+        needles = set()
+        self.always_match = False
+        for text in texts:
+            parts = [part for part in self._UNSAFE_RE.split(text) if part]
+            if not parts:
+                # Строку нельзя надежно найти в сырых байтах - проверяем все файлы
+                self.always_match = True
+                continue
+            needles.add(max(parts, key=len).encode('utf-8'))
+
+        alternatives = sorted(needles, key=len, reverse=True)
+        self.pattern = re.compile(b'|'.join(re.escape(n) for n in alternatives)) if alternatives else None
+        self.needle_count = len(needles)
+
+    def may_match(self, data):
+        """True, если в байтах data может встретиться строка каталога"""
+        if self.always_match:
+            return True
+        if self.pattern is not None and self.pattern.search(data) is not None:
+            return True
+        # Фрагмент мог быть записан сущностями
+        return any(self._entity_may_hide_text(ref) for ref in set(self._ENTITY_RE.findall(data)))
+
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def _entity_may_hide_text(cls, ref):
+        """True, если сущность раскрывается не только в пробелы и символы из _UNSAFE_RE"""
+        decoded = html_lib.unescape('&' + ref.decode('ascii'))
+        return cls._UNSAFE_RE.fullmatch(decoded) is None
+
+    def split_files(self, html_files):
+        """Разделить файлы на (кандидаты, пропущенные, байт в пропущенных)
+
+        Нечитаемый файл остается кандидатом: ошибку покажет process_html_file.
+        """
+        candidates, skipped, skipped_bytes = [], [], 0
+        for html_file in html_files:
+            try:
+                data = Path(html_file).read_bytes()
+            except OSError:
+                candidates.append(html_file)
+                continue
+            if self.may_match(data):
+                candidates.append(html_file)
+            else:
+                skipped.append(html_file)
+                skipped_bytes += len(data)
+        return candidates, skipped, skipped_bytes
+
+# Поиск элементов, которые нужно пометить
+def iter_i18n_targets(soup, reverse_map):
+    """Найти (элемент, data-атрибут, метка, текст) за один проход по дереву
+
+    Для тегов проверяются только четыре атрибута из I18N_ATTRIBUTES (прямой
+    доступ к element.attrs). Для текстовых узлов элементом считается каждый
+    предок, у которого element.string совпадает с этим узлом, т.е. цепочка
+    родителей с единственным дочерним узлом - как в исходной версии.
+    """
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            if node.name in SKIP_TAGS:
+                continue
 
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_content = f.read()
+            attrs = node.attrs
+            for attr, data_attr, label, only_tag in I18N_ATTRIBUTES:
+                value = attrs.get(attr)
+                if value is None or (only_tag and node.name != only_tag):
+                    continue
 
-        # Используем lxml парсер для лучшего сохранения структуры
-        soup = BeautifulSoup(original_content, 'lxml')
+                text = normalize_text(value)
+                if text in reverse_map and data_attr not in attrs:
+                    yield node, data_attr, label, text
 
-        processed_count = 0
+        elif isinstance(node, NavigableString):
+            if not node.strip():
+                continue
 
-        # Обработка всех элементов
-        for element in soup.find_all():
-            if not hasattr(element, 'name') or element.name is None:
+            text = normalize_text(node)
+            if text not in reverse_map:
                 continue
 
-            # Пропускаем script и style теги
-            if element.name in ['script', 'style', 'noscript']:
+            element = node.parent
+            while isinstance(element, Tag) and element is not soup and len(element.contents) == 1:
+                if element.name not in SKIP_TAGS and 'data-i18n' not in element.attrs:
+                    yield element, 'data-i18n', 'text', text
+                element = element.parent
+
+# Вставка атрибутов в исходный текст без пересборки документа
+def scan_start_tag(content, offset):
+    """Разобрать открывающий тег, начинающийся в offset
+
+    Возвращает (attrs, insert_pos, end): attrs - {имя атрибута: (начало,
+    конец, префикс)}, участок, который заменяется при смене значения, и
+    текст перед новым значением в кавычках; insert_pos - куда вставлять
+    новые атрибуты (перед '>' или перед завершающим ' /'); end - позиция
+    после '>'.
+    """
+    match = _TAG_NAME_RE.match(content, offset)
+    if not match:
+        raise ValueError(f"No start tag at offset {offset}")
+
+    pos = match.end()
+    insert_pos = pos
+    attrs = {}
+    while True:
+        match = _TAG_ATTR_RE.match(content, pos)
+        if match.end() == pos:
+            break
+        name = match.group(1)
+        if name and name.lower() not in attrs:
+            if match.group(2) is None:
+                attrs[name.lower()] = (match.end(1), match.end(1), '=')
+            else:
+                attrs[name.lower()] = (match.start(2), match.end(2), '')
+        # Завершающий '/' без атрибута - вставляем перед ним вместе с пробелами
+        insert_pos = match.start() if name is None and '/' in match.group(0) else match.end()
+        pos = match.end()
+
+    if not content.startswith('>', pos):
+        raise ValueError(f"Unterminated start tag at offset {offset}")
+    return attrs, insert_pos, pos + 1
+
+def start_tag_insert_pos(content, offset):
+    """Позиция внутри открывающего тега (начинается в offset), куда вставлять атрибуты"""
+    return scan_start_tag(content, offset)[1]
+
+def splice_attributes(content, insertions, edits=()):
+    """Собрать документ, вставив атрибуты в открывающие теги
+
+    insertions: {смещение открывающего тега: [(атрибут, значение), ...]}.
+    edits: дополнительные замены (начало, конец, текст) вне открывающих
+    тегов. Все остальные символы копируются из content без изменений.
+    """
+    changes = list(edits)
+    for offset in insertions:
+        pos = start_tag_insert_pos(content, offset)
+        text = ''.join(f' {attr}="{html_lib.escape(value, quote=True)}"' for attr, value in insertions[offset])
+        changes.append((pos, pos, text))
+
+    parts = []
+    last = 0
+    for start, end, text in sorted(changes, key=lambda change: (change[0], change[1])):
+        parts.append(content[last:start])
+        parts.append(text)
+        last = end
+    parts.append(content[last:])
+    return ''.join(parts)
+
+def tag_offset(element, line_starts):
+    """Смещение открывающего тега элемента в исходном тексте (парсер html.parser)"""
+    if element.sourceline is None:
+        raise ValueError(f"No source position for <{element.name}>")
+    return line_starts[element.sourceline - 1] + element.sourcepos
+
+# Встраивание критичных переводов в <head>
+def load_critical_catalogs(root_dir):
+    """Плоские каталоги локалей для --inline-critical (отсутствующие файлы пропускаются)"""
+    catalogs = {}
+    for locale, file_name in CRITICAL_LOCALE_CATALOGS.items():
+        try:
+            with open(Path(root_dir) / file_name, 'r', encoding='utf-8') as f:
+                catalogs[locale] = flatten_dict(json.load(f).get('strings', {}))
+        except OSError:
+            continue
+    return catalogs
+
+def critical_keys(soup):
+    """Ключи первого экрана в порядке документа
+
+    Критичные: ключи категорий CRITICAL_CATEGORIES, ключи внутри <header> и
+    <nav>, а также первые CRITICAL_FIRST_KEYS ключей страницы.
+    """
+    data_attrs = ('data-i18n',) + tuple(data_attr for _, data_attr, _, _ in I18N_ATTRIBUTES)
+    keys = []
+    seen = set()
+    for element in soup.find_all(True):
+        for data_attr in data_attrs:
+            key = element.get(data_attr)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            if (len(seen) <= CRITICAL_FIRST_KEYS or key.split('.')[0] in CRITICAL_CATEGORIES
+                    or element.find_parent(CRITICAL_CONTAINERS) is not None):
+                keys.append(key)
+    return keys
+
+def critical_payload(keys, catalogs):
+    """JSON для <script id="i18n-critical">: {локаль: {категория: {ключ: перевод}}}"""
+    payload = {}
+    for locale, flat in catalogs.items():
+        strings = payload.setdefault(locale, {})
+        for key in keys:
+            value = flat.get(key)
+            if value is None:
                 continue
+            category, _, name = key.partition('.')
+            strings.setdefault(category, {})[name] = value
+    # '<' экранируется, чтобы строка не могла закрыть тег <script>
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('<', '\\u003c')
+
+def charset_meta_end(content, soup, line_starts):
+    """Конец <meta charset> (или http-equiv="Content-Type") в <head>, либо None"""
+    for meta in soup.head.find_all('meta'):
+        if meta.sourceline is None:
+            continue
+        if meta.has_attr('charset') or meta.get('http-equiv', '').lower() == 'content-type':
+            return scan_start_tag(content, tag_offset(meta, line_starts))[2]
+    return None
+
+def _element_end(content, offset, end_tag='</script>'):
+    """Конец элемента с открывающим тегом по смещению offset (включая закрывающий тег)"""
+    return content.index(end_tag, scan_start_tag(content, offset)[2]) + len(end_tag)
+
+def critical_edits(content, soup, line_starts, catalogs):
+    """Замены для встраивания критичных переводов в <head> (режим splice)
+
+    Блок <script id="i18n-critical"> и i18n-preloader.js вставляются сразу
+    после <meta charset> (иначе после <head>): объявление кодировки должно
+    остаться в первых 1024 байтах документа. Существующий блок после
+    <meta charset> обновляется на месте, блок перед ней (прежние версии)
+    переносится. Страницы, предварительно отрисованные prerender_locales.py,
+    пропускаются. Preloader подключается без defer/async: он должен
+    переводить элементы во время разбора документа, до первой отрисовки
+    (у тегов, вставленных прежними версиями с defer, атрибут убирается).
+    """
+    head = soup.head
+    if head is None or head.sourceline is None:
+        return []
+    # Копии prerender_locales.py уже переведены
+    if soup.html is not None and soup.html.has_attr('data-i18n-locale'):
+        return []
+
+    keys = critical_keys(soup)
+    if not keys:
+        return []
+    payload = critical_payload(keys, catalogs)
+    preloader_tag = f'<script src="{CRITICAL_PRELOADER}">'
+
+    insert_at = charset_meta_end(content, soup, line_starts)
+    if insert_at is None:
+        insert_at = scan_start_tag(content, tag_offset(head, line_starts))[2]
+
+    edits = []
+    block = ''
+    existing = soup.find('script', id=CRITICAL_SCRIPT_ID)
+    if existing is not None and existing.sourceline is not None:
+        offset = tag_offset(existing, line_starts)
+        start = content.index('>', offset) + 1
+        end = content.index('</script>', start)
+        if offset >= insert_at:
+            if content[start:end] != payload:
+                edits.append((start, end, payload))
+            # Preloader должен стоять после блока
+            insert_at = end + len('</script>')
+        else:
+            edits.append((offset, end + len('</script>'), ''))
+            existing = None
+    if existing is None:
+        block = f'<script type="application/json" id="{CRITICAL_SCRIPT_ID}">{payload}</script>'
+
+    # Preloader перед блоком не нашел бы переводы - переносится за него
+    preloader_found = False
+    for script in soup.find_all('script'):
+        if CRITICAL_PRELOADER not in script.get('src', '') or script.sourceline is None:
+            continue
+        offset = tag_offset(script, line_starts)
+        if offset < insert_at:
+            edits.append((offset, _element_end(content, offset), ''))
+            continue
+        preloader_found = True
+        if 'defer' in script.attrs or 'async' in script.attrs:
+            edits.append((offset, scan_start_tag(content, offset)[2], preloader_tag))
+    if not preloader_found:
+        block += f'{preloader_tag}</script>'
+
+    if block:
+        edits.append((insert_at, insert_at, block))
+    return edits
+
+# Атомарная запись
+def atomic_write_bytes(file_path, data):
+    """Записать файл через временный файл в той же папке и os.replace
+
+    Читатели (веб-сервер, CDN) видят либо старую, либо новую версию файла,
+    но никогда не частично записанную. Права доступа сохраняются.
+    """
+    file_path = Path(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f'.{file_path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if file_path.exists():
+            shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def atomic_write_text(file_path, content):
+    """Атомарно записать текст в UTF-8 без преобразования переводов строк"""
+    atomic_write_bytes(file_path, content.encode('utf-8'))
+
+# Резервные копии с адресацией по содержимому
+class BackupStore:
+    """Хранилище резервных копий: объекты по SHA-256 и манифест на каждый запуск
+
+    objects/ab/cdef...[.gz] - содержимое файла (одинаковые версии хранятся
+    один раз), runs/<run-id>.json - какие файлы и в какой версии были
+    сохранены в этом запуске. Копируются только файлы, которые меняются.
+
+    Каждая копия сразу дописывается в журнал runs/<run-id>.journal (в том
+    числе из процессов-воркеров), поэтому прерванный запуск тоже можно
+    откатить: без манифеста load_manifest() читает журнал.
+    """
+
+    def __init__(self, root, compress=True):
+        self.root = Path(root)
+        self.compress = compress
+        self.run_id = None
+        self.base_dir = None
+
+    def _object_path(self, digest):
+        return self.root / 'objects' / digest[:2] / digest[2:]
+
+    def put(self, data):
+        """Сохранить содержимое и вернуть его SHA-256"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if path.exists() or path.with_suffix('.gz').exists():
+            return digest
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self.compress:
+            atomic_write_bytes(path.with_suffix('.gz'), gzip.compress(data, mtime=0))
+        else:
+            atomic_write_bytes(path, data)
+        return digest
+
+    def get(self, digest):
+        """Прочитать содержимое по SHA-256"""
+        path = self._object_path(digest)
+        if path.with_suffix('.gz').exists():
+            return gzip.decompress(path.with_suffix('.gz').read_bytes())
+        return path.read_bytes()
+
+    def new_run_id(self):
+        """Уникальный идентификатор запуска на основе времени"""
+        base = time.strftime('%Y%m%d-%H%M%S')
+        run_id, n = base, 1
+        while any((self.root / 'runs' / f'{run_id}{ext}').exists() for ext in ('.json', '.journal')):
+            n += 1
+            run_id = f'{base}-{n}'
+        return run_id
+
+    def start_run(self, base_dir):
+        """Начать запуск: копии файлов из base_dir записываются в его журнал"""
+        self.run_id = self.new_run_id()
+        self.base_dir = Path(base_dir)
+        (self.root / 'runs').mkdir(parents=True, exist_ok=True)
+        return self.run_id
+
+    def backup(self, file_path, data):
+        """Сохранить исходное содержимое файла и записать его в журнал запуска"""
+        digest = self.put(data)
+        if self.run_id is not None:
+            relative_path = Path(file_path).resolve().relative_to(self.base_dir.resolve()).as_posix()
+            line = json.dumps({'path': relative_path, 'sha256': digest}, ensure_ascii=False) + '\n'
+            # O_APPEND: строки из разных процессов не перемешиваются
+            fd = os.open(self.root / 'runs' / f'{self.run_id}.journal', os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            try:
+                os.write(fd, line.encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        return digest
+
+    def _read_journal(self, run_id):
+        files = {}
+        journal = self.root / 'runs' / f'{run_id}.journal'
+        with open(journal, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # недописанная строка при аварийном завершении
+                # Первая копия файла в запуске - его состояние до запуска
+                files.setdefault(entry['path'], entry['sha256'])
+        return files
+
+    def finish_run(self):
+        """Записать манифест запуска из журнала; вернуть число файлов"""
+        journal = self.root / 'runs' / f'{self.run_id}.journal'
+        if not journal.exists():
+            return 0
+        files = self._read_journal(self.run_id)
+        self.write_manifest(self.run_id, files)
+        journal.unlink()
+        return len(files)
+
+    def write_manifest(self, run_id, files):
+        """Записать манифест запуска: {относительный путь: SHA-256}"""
+        (self.root / 'runs').mkdir(parents=True, exist_ok=True)
+        manifest = {'run_id': run_id, 'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'files': dict(sorted(files.items()))}
+        atomic_write_text(self.root / 'runs' / f'{run_id}.json',
+                          json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    def _run_sort_key(run_id):
+        # 20250101-120000-10 идет после 20250101-120000-2
+        date, _, rest = run_id.partition('-')
+        clock, _, n = rest.partition('-')
+        return date, clock, int(n) if n.isdigit() else 1
+
+    def list_runs(self):
+        """Идентификаторы запусков (включая прерванные), от старых к новым"""
+        runs = {p.stem for p in (self.root / 'runs').glob('*.json')}
+        runs.update(p.stem for p in (self.root / 'runs').glob('*.journal'))
+        return sorted(runs, key=self._run_sort_key)
+
+    def load_manifest(self, run_id):
+        """Прочитать манифест запуска ('latest' - последний)
+
+        Для прерванного запуска без манифеста файлы берутся из журнала.
+        """
+        if run_id == 'latest':
+            runs = self.list_runs()
+            if not runs:
+                raise FileNotFoundError(f"No backup runs in {self.root}")
+            run_id = runs[-1]
+        manifest_path = self.root / 'runs' / f'{run_id}.json'
+        if not manifest_path.exists() and (self.root / 'runs' / f'{run_id}.journal').exists():
+            return {'run_id': run_id, 'created': 'interrupted', 'files': self._read_journal(run_id)}
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def restore(self, run_id, root_dir):
+        """Восстановить все файлы запуска; вернуть список восстановленных путей"""
+        manifest = self.load_manifest(run_id)
+        restored = []
+        for relative_path, digest in manifest['files'].items():
+            target = Path(root_dir) / relative_path
+            atomic_write_bytes(target, self.get(digest))
+            restored.append(target)
+        return manifest['run_id'], restored
+
+def restore_legacy_backups(root_dir):
+    """Восстановить файлы из *.html.backup (копии, которые делали старые версии скрипта)"""
+    restored = []
+    for backup_file in sorted(Path(root_dir).glob('**/*.html.backup')):
+        original_file = backup_file.with_suffix('')
+        shutil.copy2(backup_file, original_file)
+        restored.append(original_file)
+    return restored
 
-            # Обработка атрибутов
-            if hasattr(element, 'has_attr'):
-                # placeholder
-                if element.has_attr('placeholder'):
-                    placeholder = normalize_text(element['placeholder'])
-                    if placeholder in reverse_map and not element.has_attr('data-i18n-placeholder'):
-                        element['data-i18n-placeholder'] = reverse_map[placeholder]
-                        processed_count += 1
-                        print(f"  [placeholder] {placeholder[:50]} -> {reverse_map[placeholder]}")
-
-                # title
-                if element.has_attr('title'):
-                    title = normalize_text(element['title'])
-                    if title in reverse_map and not element.has_attr('data-i18n-title'):
-                        element['data-i18n-title'] = reverse_map[title]
-                        processed_count += 1
-                        print(f"  [title] {title[:50]} -> {reverse_map[title]}")
-
-                # alt для изображений
-                if element.name == 'img' and element.has_attr('alt'):
-                    alt = normalize_text(element['alt'])
-                    if alt in reverse_map and not element.has_attr('data-i18n-alt'):
-                        element['data-i18n-alt'] = reverse_map[alt]
-                        processed_count += 1
-                        print(f"  [alt] {alt[:50]} -> {reverse_map[alt]}")
-
-                # aria-label
-                if element.has_attr('aria-label'):
-                    aria = normalize_text(element['aria-label'])
-                    if aria in reverse_map and not element.has_attr('data-i18n-aria'):
-                        element['data-i18n-aria'] = reverse_map[aria]
-                        processed_count += 1
-                        print(f"  [aria-label] {aria[:50]} -> {reverse_map[aria]}")
-
-            # Обработка текстового контента (только прямой текст)
-            if element.string and element.string.strip():
-                text = normalize_text(element.string)
-
-                if text in reverse_map and not element.has_attr('data-i18n'):
-                    element['data-i18n'] = reverse_map[text]
-                    processed_count += 1
-                    print(f"  [text] {text[:50]} -> {reverse_map[text]}")
-
-        if processed_count > 0:
-            print(f"  ✓ Replaced {processed_count} strings")
+# Обработка одного HTML файла с сохранением форматирования
+def process_html_file(file_path, reverse_map, dry_run=False, stats=None, rewrite='splice',
+                      backup_store=None, critical=None):
+    """Обработать один HTML файл с сохранением оригинального форматирования
+
+    В режиме splice документ разбирается html.parser, который сообщает
+    позиции тегов, и новые data-i18n* атрибуты вставляются прямо в исходный
+    текст: все байты вне вставок остаются как были. В режиме serialize
+    документ пересобирается из дерева lxml (прежнее поведение).
+
+    Файл перезаписывается атомарно и только если результат отличается от
+    текущего содержимого, чтобы не менять mtime без необходимости. Перед
+    записью исходное содержимое сохраняется в backup_store (если передан).
+
+    critical - плоские каталоги {локаль: {ключ: перевод}}: ключи первого
+    экрана страницы встраиваются в <head> как <script id="i18n-critical">
+    (только в режиме splice, см. critical_edits).
+
+    Если передан словарь stats, в него записываются время разбора, поиска
+    и записи (в секундах), размер файла, признак записи ('written') и
+    SHA-256 резервной копии ('backup').
+    """
+    print(f"\n{'[DRY RUN] ' if dry_run else ''}Processing: {file_path}")
+    timings = {'parse': 0.0, 'scan': 0.0, 'write': 0.0, 'bytes': 0, 'written': False}
 
-            if not dry_run:
-                # КРИТИЧЕСКИ ВАЖНО: используем formatter=None для сохранения форматирования
-                modified_html = str(soup.prettify(formatter=None))
+    try:
+        started = time.perf_counter()
+        # newline='' - переводы строк читаются и пишутся без преобразования
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            original_content = f.read()
 
-                # Удаляем добавленные lxml теги <html> и <body>, если их не было
-                if not original_content.strip().startswith('<!DOCTYPE html>'):
-                    # Восстанавливаем оригинальную структуру
-                    modified_html = str(soup)
+        if rewrite == 'splice':
+            soup = BeautifulSoup(original_content, 'html.parser')
+            line_starts = [0] + [m.end() for m in re.finditer('\n', original_content)]
+        else:
+            # Используем lxml парсер для лучшего сохранения структуры
+            soup = BeautifulSoup(original_content, 'lxml')
+        timings['bytes'] = len(original_content)
+        timings['parse'] = time.perf_counter() - started
+
+        processed_count = 0
+        insertions = {}
+
+        # Обработка только текстовых узлов и четырех атрибутов
+        started = time.perf_counter()
+        for element, data_attr, label, text in iter_i18n_targets(soup, reverse_map):
+            element[data_attr] = reverse_map[text]
+            if rewrite == 'splice':
+                offset = tag_offset(element, line_starts)
+                insertions.setdefault(offset, []).append((data_attr, reverse_map[text]))
+            processed_count += 1
+            print(f"  [{label}] {text[:50]} -> {reverse_map[text]}")
+
+        # Ключи первого экрана учитывают и атрибуты, добавленные выше
+        edits = []
+        if critical and rewrite == 'splice':
+            edits = critical_edits(original_content, soup, line_starts, critical)
+        timings['scan'] = time.perf_counter() - started
+
+        if processed_count > 0 or edits:
+            if processed_count > 0:
+                print(f"  ✓ Replaced {processed_count} strings")
+            if edits:
+                print(f"  ✓ Inlined critical translations ({sum(len(edit[2]) for edit in edits)} bytes)")
 
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modified_html)
-                print(f"  ✓ Saved changes to {file_path}")
+            if not dry_run:
+                started = time.perf_counter()
+                if rewrite == 'splice':
+                    modified_html = splice_attributes(original_content, insertions, edits)
+                else:
+                    # КРИТИЧЕСКИ ВАЖНО: используем formatter=None для сохранения форматирования
+                    modified_html = str(soup.prettify(formatter=None))
+
+                    # Удаляем добавленные lxml теги <html> и <body>, если их не было
+                    if not original_content.strip().startswith('<!DOCTYPE html>'):
+                        # Восстанавливаем оригинальную структуру
+                        modified_html = str(soup)
+
+                if modified_html == original_content:
+                    print(f"  - Output identical to current file, not written")
+                else:
+                    if backup_store is not None:
+                        timings['backup'] = backup_store.backup(file_path, original_content.encode('utf-8'))
+                    atomic_write_text(file_path, modified_html)
+                    timings['written'] = True
+                    print(f"  ✓ Saved changes to {file_path}")
+                timings['write'] = time.perf_counter() - started
         else:
             print(f"  - No matches found")
 
+        print(f"  ⏱ parse {timings['parse'] * 1000:.1f} ms, scan {timings['scan'] * 1000:.1f} ms, "
+              f"write {timings['write'] * 1000:.1f} ms")
         return processed_count
 
     except Exception as e:
+        timings['error'] = str(e)
         print(f"  ✗ Error processing {file_path}: {e}")
         import traceback
         traceback.print_exc()
         return 0
 
+    finally:
+        if stats is not None:
+            stats.update(timings)
+
+# Параллельная обработка: обратный словарь передается в каждый процесс один раз
+_worker_reverse_map = None
+_worker_backup_store = None
+_worker_critical = None
+
+def _init_worker(reverse_map, backup_store, critical=None):
+    """Инициализация процесса-воркера"""
+    global _worker_reverse_map, _worker_backup_store, _worker_critical
+    _worker_reverse_map = reverse_map
+    _worker_backup_store = backup_store
+    _worker_critical = critical
+
+def _process_file_task(task):
+    """Обработать файл в воркере; вывод возвращается, а не печатается"""
+    html_file, dry_run, rewrite = task
+    stats = {}
+    output = io.StringIO()
+
+    with redirect_stdout(output), redirect_stderr(output):
+        count = process_html_file(html_file, _worker_reverse_map, dry_run=dry_run, stats=stats,
+                                  rewrite=rewrite, backup_store=_worker_backup_store,
+                                  critical=_worker_critical)
+
+    return count, stats, output.getvalue()
+
+def iter_processed_files(html_files, reverse_map, dry_run=False, jobs=1, rewrite='splice',
+                         backup_store=None, critical=None):
+    """Обработать файлы и вернуть (файл, число замен, stats) в исходном порядке
+
+    При jobs > 1 файлы обрабатываются пулом процессов; вывод каждого файла
+    печатается целиком и по порядку, как при последовательной обработке.
+    """
+    if jobs <= 1:
+        for html_file in html_files:
+            stats = {}
+            count = process_html_file(html_file, reverse_map, dry_run=dry_run, stats=stats,
+                                      rewrite=rewrite, backup_store=backup_store, critical=critical)
+            yield html_file, count, stats
+        return
+
+    chunksize = max(1, len(html_files) // (jobs * 4))
+    tasks = [(html_file, dry_run, rewrite) for html_file in html_files]
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(reverse_map, backup_store, critical)) as executor:
+        results = executor.map(_process_file_task, tasks, chunksize=chunksize)
+        for html_file, (count, stats, output) in zip(html_files, results):
+            sys.stdout.write(output)
+            yield html_file, count, stats
+
+# Сводка по времени обработки
+def print_timing_summary(file_timings, run_time, slowest=5):
+    """Вывести суммарное время по этапам и самые медленные файлы"""
+    totals = {phase: sum(t.get(phase, 0.0) for t in file_timings.values())
+              for phase in ('parse', 'scan', 'write')}
+    total_bytes = sum(t.get('bytes', 0) for t in file_timings.values())
+
+    print(f"Total time: {run_time:.2f}s "
+          f"(parse {totals['parse']:.2f}s, scan {totals['scan']:.2f}s, write {totals['write']:.2f}s, "
+          f"{total_bytes / 1024 / max(run_time, 1e-9):.0f} KB/s)")
+
+    ranked = sorted(file_timings.items(),
+                    key=lambda item: -sum(item[1].get(phase, 0.0) for phase in totals))
+    if ranked:
+        print(f"Slowest files:")
+        for file_path, t in ranked[:slowest]:
+            elapsed = sum(t.get(phase, 0.0) for phase in totals)
+            print(f"  {elapsed * 1000:8.1f} ms  {file_path}")
+
 # Основная функция
 def main():
     """Главная функция"""
@@ -159,22 +771,52 @@ def main():
     parser = argparse.ArgumentParser(description='Replace hardcoded strings with data-i18n attributes (v2 - preserves formatting)')
     parser.add_argument('--dry-run', action='store_true', help='Preview changes without modifying files')
     parser.add_argument('--limit', type=int, help='Limit number of files to process (for testing)')
-    parser.add_argument('--restore', action='store_true', help='Restore original files from .backup')
+    parser.add_argument('--restore', nargs='?', const='latest', metavar='RUN_ID',
+                        help=f'Restore the files changed by a run from {BACKUP_STORE_DIR} (default: latest run); '
+                             f'"legacy" restores the *.html.backup copies made by older versions')
+    parser.add_argument('--list-backups', action='store_true', help='List backup runs and exit')
+    parser.add_argument('--no-prescan', action='store_true',
+                        help='Parse every file even if its raw bytes contain no catalog string')
+    parser.add_argument('--no-compress-backups', action='store_true', help='Store backup blobs uncompressed')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of worker processes (default: 1)')
+    parser.add_argument('--rewrite', choices=REWRITE_MODES, default='splice',
+                        help='splice: insert attributes into the original text (default); '
+                             'serialize: re-serialize the whole document (old behaviour)')
+    parser.add_argument('--inline-critical', action='store_true',
+                        help='Embed each page\'s above-the-fold translations (navigation, hero, buttons) '
+                             'as an inline JSON script in <head>; the rest loads lazily')
     args = parser.parse_args()
+    if args.inline_critical and args.rewrite != 'splice':
+        parser.error('--inline-critical requires --rewrite splice')
+
+    root_dir = Path(__file__).parent
+    backup_store = BackupStore(root_dir / BACKUP_STORE_DIR, compress=not args.no_compress_backups)
+
+    if args.list_backups:
+        for run_id in backup_store.list_runs():
+            manifest = backup_store.load_manifest(run_id)
+            print(f"  {run_id}  {len(manifest['files']):4} files  ({manifest['created']})")
+        legacy = sum(1 for _ in root_dir.glob('**/*.html.backup'))
+        if legacy:
+            print(f"  legacy  {legacy:4} *.html.backup files (--restore legacy)")
+        return
+
+    if args.restore == 'legacy':
+        print("Restoring original files from *.html.backup copies...")
+        restored = restore_legacy_backups(root_dir)
+        for original_file in restored:
+            print(f"  ✓ Restored {original_file}")
+        print(f"\n✓ Restored {len(restored)} files")
+        return
 
     if args.restore:
-        print("Restoring original files from backups...")
-        root_dir = Path(__file__).parent
-        backup_files = list(root_dir.glob('**/*.html.backup'))
-
-        for backup_file in backup_files:
-            original_file = backup_file.with_suffix('')
-            if backup_file.exists():
-                import shutil
-                shutil.copy2(backup_file, original_file)
-                print(f"  ✓ Restored {original_file}")
-
-        print(f"\n✓ Restored {len(backup_files)} files")
+        print(f"Restoring original files from backup run '{args.restore}'...")
+        run_id, restored = backup_store.restore(args.restore, root_dir)
+
+        for original_file in restored:
+            print(f"  ✓ Restored {original_file}")
+
+        print(f"\n✓ Restored {len(restored)} files from run {run_id}")
         return
 
     print("=" * 60)
@@ -191,9 +833,13 @@ def main():
     print(f"   ✓ Loaded {len(flat_dict)} translation keys")
     print(f"   ✓ Created reverse map with {len(reverse_map)} unique strings")
 
+    critical = None
+    if args.inline_critical:
+        critical = load_critical_catalogs(root_dir)
+        print(f"   ✓ Critical translations: {', '.join(critical) or 'no catalogs found'}")
+
     # Поиск всех HTML файлов
     print("\n2. Finding HTML files...")
-    root_dir = Path(__file__).parent
     html_files = list(root_dir.glob('**/*.html'))
 
     # Исключаем некоторые директории
@@ -202,53 +848,95 @@ def main():
         f for f in html_files
         if not any(excluded in f.parts for excluded in excluded_dirs)
     ]
+    # Переведенные копии prerender_locales.py (en/, zh-tw/, data-i18n-locale) не обрабатываются
+    html_files = [f for f in html_files if not is_locale_copy(f, root_dir)]
 
     if args.limit:
         html_files = html_files[:args.limit]
 
     print(f"   ✓ Found {len(html_files)} HTML files to process")
 
-    # Создаем бэкапы перед изменением
+    # Предварительная проверка: файлы без строк каталога не разбираются
+    skipped_files, skipped_bytes, prescan_time = [], 0, 0.0
+    if not args.no_prescan:
+        started = time.perf_counter()
+        prefilter = CatalogPrefilter(reverse_map)
+        html_files, skipped_files, skipped_bytes = prefilter.split_files(html_files)
+        prescan_time = time.perf_counter() - started
+        print(f"   ✓ Pre-scan ({prefilter.needle_count} patterns, {prescan_time * 1000:.0f} ms): "
+              f"{len(html_files)} candidates, {len(skipped_files)} files without catalog strings skipped")
+
+    # Бэкапы делаются только для изменяемых файлов, прямо перед записью
+    run_id = None
     if not args.dry_run:
-        print("\n3. Creating backups...")
-        for html_file in html_files:
-            backup_file = html_file.with_suffix('.html.backup')
-            if not backup_file.exists():
-                import shutil
-                shutil.copy2(html_file, backup_file)
-        print(f"   ✓ Created {len(html_files)} backup files")
+        run_id = backup_store.start_run(root_dir)
+        print(f"\n3. Backups: changed files will be saved to {BACKUP_STORE_DIR} (run {run_id})")
 
     # Обработка файлов
     print(f"\n4. {'Preview mode' if args.dry_run else 'Processing files'}...")
 
     total_replacements = 0
     processed_files = 0
+    file_timings = {}
+    failed_files = []
+    run_started = time.perf_counter()
 
-    for html_file in html_files:
-        count = process_html_file(html_file, reverse_map, dry_run=args.dry_run)
-        if count > 0:
-            total_replacements += count
-            processed_files += 1
+    # Манифест пишется из журнала и при исключении/прерывании (Ctrl+C)
+    backed_up = 0
+    try:
+        for html_file, count, stats in iter_processed_files(html_files, reverse_map, dry_run=args.dry_run,
+                                                            jobs=args.jobs, rewrite=args.rewrite,
+                                                            backup_store=backup_store, critical=critical):
+            file_timings[html_file] = stats
+            if 'error' in stats:
+                failed_files.append((html_file, stats['error']))
+            if count > 0:
+                total_replacements += count
+                processed_files += 1
+    finally:
+        if run_id is not None:
+            backed_up = backup_store.finish_run()
+
+    run_time = time.perf_counter() - run_started
 
     # Итоги
     print("\n" + "=" * 60)
     print("SUMMARY")
     print("=" * 60)
     print(f"Total files processed: {len(html_files)}")
+    if skipped_files:
+        # Оценка: пропущенные байты со средней скоростью разбора обработанных файлов
+        parsed_bytes = sum(t.get('bytes', 0) for t in file_timings.values())
+        parse_time = sum(t.get('parse', 0.0) + t.get('scan', 0.0) for t in file_timings.values())
+        saved = skipped_bytes * parse_time / parsed_bytes if parsed_bytes else 0.0
+        print(f"Files skipped by pre-scan: {len(skipped_files)} ({skipped_bytes / 1024:.0f} KB, "
+              f"~{saved:.2f}s of DOM parsing saved, pre-scan took {prescan_time:.2f}s)")
     print(f"Files with replacements: {processed_files}")
     print(f"Total string replacements: {total_replacements}")
+    if not args.dry_run:
+        written = sum(1 for stats in file_timings.values() if stats.get('written'))
+        print(f"Files written: {written} (unchanged files are not rewritten)")
+    print_timing_summary(file_timings, run_time)
+
+    if failed_files:
+        print(f"\n✗ Errors in {len(failed_files)} files:")
+        for html_file, error in failed_files:
+            print(f"  {html_file}: {error}")
 
     if args.dry_run:
         print("\n⚠️  DRY RUN MODE - No files were modified")
         print("Run without --dry-run to apply changes")
     else:
         print("\n✓ All changes saved successfully!")
-        print("\nBackup files created with .backup extension")
-        print("To restore: python3 replace_hardcoded_strings_v2.py --restore")
-        print("\nNext steps:")
-        print("1. Test the pages in a browser")
-        print("2. If styles are broken, run: python3 replace_hardcoded_strings_v2.py --restore")
-        print("3. If everything works, commit changes to git")
+        if backed_up:
+            print(f"\nOriginals of {backed_up} changed files saved in {BACKUP_STORE_DIR} (run {run_id})")
+            print(f"To restore: python3 replace_hardcoded_strings_v2.py --restore {run_id}")
+            print("\nNext steps:")
+            print("1. Test the pages in a browser")
+            print(f"2. If styles are broken, run: python3 replace_hardcoded_strings_v2.py --restore {run_id}")
+            print("3. If everything works, commit changes to git")
+        else:
+            print("\nNo files were changed, nothing to restore")
 
 if __name__ == '__main__':
     main()
@@ -8,6 +8,8 @@ Preserves all keys, only translates values
 import json
 import re
 
+from translation_memory import DEFAULT_MEMORY_PATH, TranslationMemory, collect_strings, rules_fingerprint
+
 # Translation dictionary for common healthcare/medical terms
 TRANSLATIONS = {
     # Organization
@@ -153,22 +155,34 @@ def translate_text(text):
     return translated
 
 
-def translate_json_values(data):
+RULES_VERSION = rules_fingerprint('translate_to_english', TRANSLATIONS)
+
+
+def translate_json_values(data, translate=translate_text):
     """
     Recursively translate all values in JSON structure
     Preserves all keys unchanged
     """
     if isinstance(data, dict):
-        return {key: translate_json_values(value) for key, value in data.items()}
+        return {key: translate_json_values(value, translate) for key, value in data.items()}
     elif isinstance(data, list):
-        return [translate_json_values(item) for item in data]
+        return [translate_json_values(item, translate) for item in data]
     elif isinstance(data, str):
-        return translate_text(data)
+        return translate(data)
     else:
         return data
 
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Translate Korean values in i18n_categorized.json to English')
+    parser.add_argument('--memory', default=str(DEFAULT_MEMORY_PATH),
+                        help='Translation memory file (see translation_memory.py)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Translate every string with the rules, ignoring the translation memory')
+    args = parser.parse_args()
+
     input_file = 'i18n_categorized.json'
     output_file = 'i18n_categorized_english.json'
 
@@ -180,8 +194,18 @@ def main():
     print(f"Translating values to English...")
     print(f"Total categories: {len(data.get('strings', {}))}")
 
-    # Translate all values
-    translated_data = translate_json_values(data)
+    # Collect every leaf string first; duplicates are translated once
+    strings = list(dict.fromkeys(collect_strings(data, [])))
+    if args.no_memory:
+        translations = {text: translate_text(text) for text in strings}
+    else:
+        # The memory answers strings seen in earlier runs
+        with TranslationMemory(args.memory) as memory:
+            translations = memory.translate_all(strings, translate_text, 'en', RULES_VERSION)
+            print(f"Translation memory: {memory.hits} hits, {memory.misses} translated")
+
+    # Rebuild the JSON structure from the results
+    translated_data = translate_json_values(data, translations.__getitem__)
 
     # Save to new file
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -201,7 +225,7 @@ def main():
             for v in obj.values():
                 count += count_korean(v)
         elif isinstance(obj, str):
-            if any('\uac00' <= char <= '\ud7a3' for char in v):
+            if any('\uac00' <= char <= '\ud7a3' for char in obj):
                 count += 1
         return count
 
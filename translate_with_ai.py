@@ -6,7 +6,10 @@ Uses comprehensive translation for all Korean strings
 """
 
 import json
-import re
+
+from mt_backend import (DEFAULT_BATCH_CHARS, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, DEFAULT_RETRIES,
+                        BatchTranslator, IncompleteTranslation, make_backend)
+from translation_memory import DEFAULT_MEMORY_PATH, TranslationMemory, collect_strings, rules_fingerprint
 
 
 def is_korean(text):
@@ -16,94 +19,220 @@ def is_korean(text):
     return any('\uac00' <= char <= '\ud7a3' for char in text)
 
 
+# Dictionary of comprehensive translations
+# Constraint (checked by PhraseTranslator when the module is loaded): the
+# translation of a phrase longer than MIN_PARTIAL_LENGTH must not overlap a
+# shorter partial phrase, otherwise replacing it could create a new match
+# and the one-pass translator would differ from sequential str.replace.
+TRANSLATIONS = {
+    # Full sentences and phrases
+    "Wellio leads the way in advanced glucose monitoring by combining cutting-edge technology with smart data analysis. Through collaboration with health experts and research partners, we provide practical solutions for managing blood glucose and supporting a healthier life":
+        "The Healthcare Research Center leads future-oriented research and technology development through collaboration with leading domestic and international research institutes, public institutions, and industries. Through close networks with recognized partners in each field, we create practical solutions for disease prevention and treatment.",
+
+    "출시 기념으로 한정 기간 동안 특별 할인 이벤트를 진행하오니 많은 관심과 참여 부탁드립니다.":
+        "We are holding a special discount event for a limited time to celebrate the launch. We look forward to your interest and participation.",
+
+    "출시 및 유지 보수": "Launch and Maintenance",
+
+    "클라우드 환경을 활용한 데이터 관리 및 처리로, 유연하고 확장 가능한 시스템을 제공합니다. 사용자와 데이터가 분산되어 있어, 더 안전하고 빠르게 서비스를 제공합니다.":
+        "We provide a flexible and scalable system through data management and processing using cloud environments. With distributed users and data, we deliver services more securely and quickly.",
+
+    "풍성한 한가위 되시길 바랍니다.": "Wishing you a prosperous Chuseok (Korean Thanksgiving).",
+
+    "필요한 자료가 없거나 추가 If you have any questions, please let us know at any time.":
+        "If you need any additional materials or have further inquiries, please feel free to contact us anytime.",
+
+    "건강의학연구센터 설립": "Healthcare Research Center Establishment",
+    "What is Wellio?": "What is the Healthcare Research Center?",
+    "At Wellio, our mission is to empower people with precise and painless glucose monitoring. I am proud to guide our talented team toward innovation that transforms daily healthcare and enhances quality of life worldwide.": "Thank you sincerely for visiting the Healthcare Research Center.",
+    "Frequently Asked Questions about Wellio": "Frequently Asked Questions about the Healthcare Research Center",
+    "Frequently Asked Questions about Wellio": "You can find answers to frequently asked questions about the Healthcare Research Center.",
+    "Explore the research and activities of the Health and Medical Research Center through photos.": "Explore the research and activities of the Healthcare Research Center through photos.",
+    "Check out the latest news, research announcements, and press releases from the Center for Health and Medical Research.": "Check out the latest news, research announcements, and press releases from the Healthcare Research Center.",
+
+    "경기도 연구소": "Gyeonggi Province Research Institute",
+    "고객 만족도 향상을 위한 설문 조사 참여 요청 및 경품 안내": "Request to participate in customer satisfaction survey and prize information",
+
+    # Organization names
+    "건강의학연구센터": "Healthcare Research Center",
+    "건강 의학 연구 센터": "Healthcare Research Center",
+
+    # Common terms
+    "성함": "Name",
+    "이름": "Name",
+    "이메일": "Email",
+    "전화번호": "Phone Number",
+    "연락처": "Contact",
+    "내용": "Message",
+    "문의": "Inquiry",
+    "제목": "Subject",
+    "주소": "Address",
+
+    # Actions
+    "문의하기": "Submit Inquiry",
+    "검색": "Search",
+    "View list": "View List",
+    "더보기": "See More",
+    "보기": "View",
+    "다운로드": "Download",
+
+    # Research terms
+    "AI 기반 건강 데이터 분석 플랫폼 개발": "AI-based Health Data Analysis Platform Development",
+    "개인 맞춤형 건강 플랫폼 및 디지털 치료제": "Personalized Health Platform and Digital Therapeutics",
+    "질병 예방을 위한 빅데이터 기반 예측 모델": "Big Data-based Prediction Model for Disease Prevention",
+    "신종 감염병 백신 개발 및 임상 연구": "New Infectious Disease Vaccine Development and Clinical Research",
+    "유전자 분석 기술을 활용한 맞춤형 의학": "Personalized Medicine Using Gene Analysis Technology",
+
+    # Locations
+    "서울특별시 강남구": "Gangnam-gu, Seoul",
+    "경기도": "Gyeonggi Province",
+    "부산광역시": "Busan Metropolitan City",
+    "본사": "Headquarters",
+
+    # Single words - common
+    "연구": "Research",
+    "개발": "Development",
+    "건강": "Health",
+    "의학": "Medicine",
+    "기술": "Technology",
+    "혁신": "Innovation",
+    "데이터": "Data",
+    "분석": "Analysis",
+    "플랫폼": "Platform",
+    "솔루션": "Solution",
+    "서비스": "Service",
+    "제품": "Product",
+    "협력": "Collaboration",
+    "파트너": "Partner",
+}
+
+# Only phrases longer than this are replaced inside longer strings
+MIN_PARTIAL_LENGTH = 5
+
+
+class PhraseTranslator:
+    """Phrase dictionary compiled once into an Aho-Corasick automaton
+
+    translate() gives the same result as trying an exact match and then
+    replacing every phrase longer than MIN_PARTIAL_LENGTH in longest-first
+    order with str.replace. All phrase occurrences are found in one
+    left-to-right pass over the text. They are then accepted in that same
+    priority order, skipping any that overlap an already accepted one.
+
+    This is only equivalent if no replacement can create a new match of a
+    later phrase, inside the translation or across its edges; the
+    constructor checks that and raises ValueError otherwise.
+    """
+
+    def __init__(self, phrases, min_partial_length=MIN_PARTIAL_LENGTH):
+        self.exact = dict(phrases)
+        ordered = [(source, target) for source, target in
+                   sorted(self.exact.items(), key=lambda x: -len(x[0]))
+                   if len(source) > min_partial_length]
+        self.targets = [target for _, target in ordered]
+        self.lengths = [len(source) for source, _ in ordered]
+        self.check_no_new_matches(ordered)
+
+        # Trie: goto[state] maps char -> state, out[state] lists phrase ranks
+        self.goto = [{}]
+        self.out = [[]]
+        for rank, (source, _) in enumerate(ordered):
+            state = 0
+            for char in source:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.out.append([])
+                state = next_state
+            self.out[state].append(rank)
+
+        # Failure links in breadth-first order
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.out[next_state] = self.out[next_state] + self.out[self.fail[next_state]]
+
+    @staticmethod
+    def check_no_new_matches(ordered):
+        """Raise ValueError if a translation could form a later phrase with its surroundings"""
+        for rank, (source, target) in enumerate(ordered):
+            for later, _ in ordered[rank + 1:]:
+                edges = range(1, len(later))
+                if (later in target or target in later
+                        or any(target.endswith(later[:k]) or target.startswith(later[-k:]) for k in edges)):
+                    raise ValueError(f"Translation of {source[:40]!r} can create a new match of {later[:40]!r}; "
+                                     f"the one-pass replacement would differ from sequential str.replace")
+
+    def find_all(self, text):
+        """Every (start, rank) occurrence of a phrase in text, in one pass"""
+        occurrences = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for rank in self.out[state]:
+                occurrences.append((index + 1 - self.lengths[rank], rank))
+        return occurrences
+
+    def translate(self, text):
+        """Translate text: exact match, otherwise replace known phrases"""
+        if not isinstance(text, str):
+            return text
+
+        # If already English, return as is
+        if not is_korean(text):
+            return text
+
+        # Try exact match first
+        if text in self.exact:
+            return self.exact[text]
+
+        # Accept occurrences longest phrase first, then left to right
+        taken = bytearray(len(text))
+        accepted = []
+        for start, rank in sorted(self.find_all(text), key=lambda o: (o[1], o[0])):
+            end = start + self.lengths[rank]
+            if not any(taken[start:end]):
+                taken[start:end] = b'\x01' * (end - start)
+                accepted.append((start, end, rank))
+
+        parts = []
+        last = 0
+        for start, end, rank in sorted(accepted):
+            parts.append(text[last:start])
+            parts.append(self.targets[rank])
+            last = end
+        parts.append(text[last:])
+
+        # If still contains Korean after all translations, it is returned
+        # partially translated (needs manual translation)
+        return ''.join(parts)
+
+
+PHRASE_TRANSLATOR = PhraseTranslator(TRANSLATIONS)
+RULES_VERSION = rules_fingerprint('translate_with_ai', TRANSLATIONS)
+
+
 def translate_korean_to_english(text):
     """
     Comprehensive Korean to English translation
     This is a reference translation - you may want to adjust based on context
     """
+    return PHRASE_TRANSLATOR.translate(text)
+
 
-    # Dictionary of comprehensive translations
-    translations = {
-        # Full sentences and phrases
-        "Wellio leads the way in advanced glucose monitoring by combining cutting-edge technology with smart data analysis. Through collaboration with health experts and research partners, we provide practical solutions for managing blood glucose and supporting a healthier life":
-            "The Healthcare Research Center leads future-oriented research and technology development through collaboration with leading domestic and international research institutes, public institutions, and industries. Through close networks with recognized partners in each field, we create practical solutions for disease prevention and treatment.",
-
-        "출시 기념으로 한정 기간 동안 특별 할인 이벤트를 진행하오니 많은 관심과 참여 부탁드립니다.":
-            "We are holding a special discount event for a limited time to celebrate the launch. We look forward to your interest and participation.",
-
-        "출시 및 유지 보수": "Launch and Maintenance",
-
-        "클라우드 환경을 활용한 데이터 관리 및 처리로, 유연하고 확장 가능한 시스템을 제공합니다. 사용자와 데이터가 분산되어 있어, 더 안전하고 빠르게 서비스를 제공합니다.":
-            "We provide a flexible and scalable system through data management and processing using cloud environments. With distributed users and data, we deliver services more securely and quickly.",
-
-        "풍성한 한가위 되시길 바랍니다.": "Wishing you a prosperous Chuseok (Korean Thanksgiving).",
-
-        "필요한 자료가 없거나 추가 If you have any questions, please let us know at any time.":
-            "If you need any additional materials or have further inquiries, please feel free to contact us anytime.",
-
-        "건강의학연구센터 설립": "Healthcare Research Center Establishment",
-        "What is Wellio?": "What is the Healthcare Research Center?",
-        "At Wellio, our mission is to empower people with precise and painless glucose monitoring. I am proud to guide our talented team toward innovation that transforms daily healthcare and enhances quality of life worldwide.": "Thank you sincerely for visiting the Healthcare Research Center.",
-        "Frequently Asked Questions about Wellio": "Frequently Asked Questions about the Healthcare Research Center",
-        "Frequently Asked Questions about Wellio": "You can find answers to frequently asked questions about the Healthcare Research Center.",
-        "Explore the research and activities of the Health and Medical Research Center through photos.": "Explore the research and activities of the Healthcare Research Center through photos.",
-        "Check out the latest news, research announcements, and press releases from the Center for Health and Medical Research.": "Check out the latest news, research announcements, and press releases from the Healthcare Research Center.",
-
-        "경기도 연구소": "Gyeonggi Province Research Institute",
-        "고객 만족도 향상을 위한 설문 조사 참여 요청 및 경품 안내": "Request to participate in customer satisfaction survey and prize information",
-
-        # Organization names
-        "건강의학연구센터": "Healthcare Research Center",
-        "건강 의학 연구 센터": "Healthcare Research Center",
-
-        # Common terms
-        "성함": "Name",
-        "이름": "Name",
-        "이메일": "Email",
-        "전화번호": "Phone Number",
-        "연락처": "Contact",
-        "내용": "Message",
-        "문의": "Inquiry",
-        "제목": "Subject",
-        "주소": "Address",
-
-        # Actions
-        "문의하기": "Submit Inquiry",
-        "검색": "Search",
-        "View list": "View List",
-        "더보기": "See More",
-        "보기": "View",
-        "다운로드": "Download",
-
-        # Research terms
-        "AI 기반 건강 데이터 분석 플랫폼 개발": "AI-based Health Data Analysis Platform Development",
-        "개인 맞춤형 건강 플랫폼 및 디지털 치료제": "Personalized Health Platform and Digital Therapeutics",
-        "질병 예방을 위한 빅데이터 기반 예측 모델": "Big Data-based Prediction Model for Disease Prevention",
-        "신종 감염병 백신 개발 및 임상 연구": "New Infectious Disease Vaccine Development and Clinical Research",
-        "유전자 분석 기술을 활용한 맞춤형 의학": "Personalized Medicine Using Gene Analysis Technology",
-
-        # Locations
-        "서울특별시 강남구": "Gangnam-gu, Seoul",
-        "경기도": "Gyeonggi Province",
-        "부산광역시": "Busan Metropolitan City",
-        "본사": "Headquarters",
-
-        # Single words - common
-        "연구": "Research",
-        "개발": "Development",
-        "건강": "Health",
-        "의학": "Medicine",
-        "기술": "Technology",
-        "혁신": "Innovation",
-        "데이터": "Data",
-        "분석": "Analysis",
-        "플랫폼": "Platform",
-        "솔루션": "Solution",
-        "서비스": "Service",
-        "제품": "Product",
-        "협력": "Collaboration",
-        "파트너": "Partner",
-    }
+def _translate_reference(text):
+    """Original sequential longest-first str.replace translation, used by --verify"""
+    translations = TRANSLATIONS
 
     if not isinstance(text, str):
         return text
@@ -118,7 +247,7 @@ def translate_korean_to_english(text):
 
     # Try partial matching for longer phrases
     for korean, english in sorted(translations.items(), key=lambda x: -len(x[0])):
-        if len(korean) > 5 and korean in text:
+        if len(korean) > MIN_PARTIAL_LENGTH and korean in text:
             text = text.replace(korean, english)
 
     # If still contains Korean after all translations, return original
@@ -126,19 +255,59 @@ def translate_korean_to_english(text):
     return text
 
 
-def process_json_recursively(obj):
+def verify_translator(data):
+    """Regression check: compiled translator vs the original replace loop
+
+    Runs over every string in the catalog, plus every dictionary phrase
+    embedded in Korean context and paired with every other phrase, so
+    overlapping and adjacent phrases are covered too.
+    """
+    texts = collect_strings(data, [])
+    phrases = list(TRANSLATIONS)
+    texts += [f"다음은 {a} 입니다" for a in phrases]
+    texts += [f"{a} {b}" for a in phrases for b in phrases]
+    texts += [a + b for a in phrases for b in phrases]
+
+    mismatches = [t for t in texts if translate_korean_to_english(t) != _translate_reference(t)]
+    print(f"🔍 Verified {len(texts)} strings: {len(mismatches)} mismatches")
+    for text in mismatches[:10]:
+        print(f"   ✗ {text[:80]}")
+    return not mismatches
+
+
+def process_json_recursively(obj, translate=translate_korean_to_english):
     """Recursively process JSON structure and translate Korean values"""
     if isinstance(obj, dict):
-        return {key: process_json_recursively(value) for key, value in obj.items()}
+        return {key: process_json_recursively(value, translate) for key, value in obj.items()}
     elif isinstance(obj, list):
-        return [process_json_recursively(item) for item in obj]
+        return [process_json_recursively(item, translate) for item in obj]
     elif isinstance(obj, str):
-        return translate_korean_to_english(obj)
+        return translate(obj)
     else:
         return obj
 
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Translate Korean values in i18n_categorized.json to English')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check the compiled translator against the original algorithm and exit')
+    parser.add_argument('--memory', default=str(DEFAULT_MEMORY_PATH),
+                        help='Translation memory file (see translation_memory.py)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Translate every string with the rules, ignoring the translation memory')
+    parser.add_argument('--backend', choices=['rules', 'stub', 'http'], default='rules',
+                        help='rules: phrase dictionary; stub: local deterministic MT stand-in; '
+                             'http: MT service at --endpoint')
+    parser.add_argument('--endpoint', help='URL of the MT service for --backend http')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Max strings per MT request')
+    parser.add_argument('--batch-chars', type=int, default=DEFAULT_BATCH_CHARS, help='Max characters per MT request')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Max MT requests in flight')
+    parser.add_argument('--rate', type=float, help='Max MT requests per second')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help='Retries per failed MT request')
+    args = parser.parse_args()
+
     input_file = 'i18n_categorized.json'
     output_file = 'i18n_english.json'
 
@@ -147,10 +316,45 @@ def main():
     with open(input_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
+    if args.verify:
+        raise SystemExit(0 if verify_translator(data) else 1)
+
     print(f"🔄 Translating Korean text to English...")
 
-    # Translate all values
-    translated_data = process_json_recursively(data)
+    # Machine translation only sees strings the memory cannot answer
+    translator = None
+    version = RULES_VERSION
+    if args.backend != 'rules':
+        backend = make_backend(args.backend, args.endpoint, translate_korean_to_english)
+        translator = BatchTranslator(backend, 'ko', 'en', args.batch_size, args.batch_chars,
+                                     args.concurrency, args.rate, args.retries)
+        version = f"mt:{args.backend}:{args.endpoint or ''}"
+
+    # Collect every Korean leaf string first; duplicates are translated once
+    korean = list(dict.fromkeys(text for text in collect_strings(data, []) if is_korean(text)))
+    translate_many = translator.translate_many if translator else None
+    try:
+        if args.no_memory:
+            if translate_many:
+                translations = dict(zip(korean, translate_many(korean)))
+            else:
+                translations = {text: translate_korean_to_english(text) for text in korean}
+        else:
+            # The memory answers strings seen in earlier runs
+            with TranslationMemory(args.memory) as memory:
+                translations = memory.translate_all(korean, translate_korean_to_english, 'en', version,
+                                                    translate_many, 'mt' if translator else 'rules')
+                print(f"💾 Translation memory: {memory.hits} hits, {memory.misses} translated")
+    except IncompleteTranslation as e:
+        kept = 'saved to the translation memory' if not args.no_memory else 'discarded (--no-memory)'
+        print(f"❌ Machine translation failed: {e}")
+        print(f"   {len(e.translations)} translations of completed batches {kept}; {output_file} not written")
+        raise SystemExit(1)
+    if translator:
+        print(f"🌐 {translator.summary()}")
+
+    # Rebuild the JSON structure from the results
+    translated_data = process_json_recursively(data, lambda text: translations.get(text, text))
 
     # Save result
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent translation memory shared by the translate_* scripts
+
+Entries are keyed by the SHA-1 of the source string, the target locale,
+the origin and the rule set that produced them, so the rule dictionaries
+of different scripts (translate_with_ai, translate_to_english) and MT
+backends keep separate entries instead of overwriting each other. Rule
+and machine translations are stored with the version of the rules or
+backend that produced them and are ignored once that version changes;
+imported or manual translations (no version) are always reused and take
+precedence over generated ones.
+"""
+
+import json
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+from mt_backend import IncompleteTranslation
+
+DEFAULT_MEMORY_PATH = Path(__file__).parent / 'translation_memory.sqlite'
+EXPORT_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_hash TEXT NOT NULL,
+    locale TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    rules_set TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    rules_version TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (source_hash, locale, origin, rules_set)
+)
+"""
+COLUMNS = ('source_hash', 'locale', 'origin', 'rules_set', 'source', 'target', 'rules_version', 'updated_at')
+
+# Stay below SQLite's default limit of 999 bound parameters per statement
+QUERY_BATCH_SIZE = 500
+
+
+def source_hash(text):
+    """SHA-1 of a source string"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def rules_fingerprint(name, rules):
+    """Version tag for a rule dictionary: name plus a short hash of its content"""
+    digest = hashlib.sha1(json.dumps(rules, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    return f"{name}:{digest.hexdigest()[:12]}"
+
+
+def rules_set(rules_version):
+    """Rule set of a version tag: 'translate_with_ai:ab12...' -> 'translate_with_ai', 'mt:http:...' -> 'mt'
+
+    Unversioned (imported or manual) entries have the empty rule set.
+    """
+    return rules_version.partition(':')[0] if rules_version else ''
+
+
+class TranslationMemory:
+    """SQLite-backed map of (source string, locale) -> translation"""
+
+    def __init__(self, path=DEFAULT_MEMORY_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self._migrate()
+        self.conn.execute(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def _migrate(self):
+        """Move entries of the old (source_hash, locale) key schema to the current one"""
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(translations)')]
+        if not columns or 'rules_set' in columns:
+            return
+        self.conn.execute('ALTER TABLE translations RENAME TO translations_old')
+        self.conn.execute(SCHEMA)
+        rows = self.conn.execute('SELECT source_hash, locale, origin, source, target, rules_version, updated_at '
+                                 'FROM translations_old').fetchall()
+        self.conn.executemany(
+            f'INSERT OR REPLACE INTO translations ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})',
+            ((hash_, locale, origin, rules_set(version), source, target, version, updated)
+             for hash_, locale, origin, source, target, version, updated in rows))
+        self.conn.execute('DROP TABLE translations_old')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, sources, locale, rules_version=None):
+        """Return {source: target} for the sources the memory can answer
+
+        Versioned entries only count if they were produced by rules_version;
+        unversioned (imported or manual) entries always count and win.
+        """
+        by_hash = {source_hash(source): source for source in set(sources)}
+        wanted_set = rules_set(rules_version)
+        hashes = list(by_hash)
+        result = {}
+        manual = set()
+        for start in range(0, len(hashes), QUERY_BATCH_SIZE):
+            batch = hashes[start:start + QUERY_BATCH_SIZE]
+            rows = self.conn.execute(
+                'SELECT source_hash, target, rules_set, rules_version FROM translations '
+                f'WHERE locale = ? AND source_hash IN ({", ".join("?" * len(batch))})',
+                (locale, *batch))
+            for hash_, target, entry_set, version in rows:
+                source = by_hash[hash_]
+                if version is None:
+                    result[source] = target
+                    manual.add(source)
+                elif version == rules_version and entry_set == wanted_set and source not in manual:
+                    result[source] = target
+        return result
+
+    def _put_rows(self, rows):
+        self.conn.executemany(
+            f'INSERT OR REPLACE INTO translations ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})',
+            rows)
+        self.conn.commit()
+
+    def put_many(self, pairs, locale, origin='rules', rules_version=None):
+        """Store (source, target) pairs for locale"""
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        self._put_rows((source_hash(source), locale, origin, rules_set(rules_version), source, target,
+                        rules_version, now) for source, target in pairs)
+
+    def translate_all(self, sources, translate, locale, rules_version=None,
+                      translate_many=None, origin='rules'):
+        """Translate sources, calling translate() only for memory misses
+
+        With translate_many (list -> list), all misses are passed in a single
+        call instead, e.g. to a batched MT backend. Results are written back
+        under rules_version, so the next run only translates new or changed
+        strings. Returns {source: target}.
+        """
+        unique = list(dict.fromkeys(sources))
+        result = self.get_many(unique, locale, rules_version)
+        missing = [source for source in unique if source not in result]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+
+        if translate_many:
+            try:
+                translated = dict(zip(missing, translate_many(missing)))
+            except IncompleteTranslation as e:
+                # Keep the batches that succeeded; the next run only retries the rest
+                self.put_many(e.translations.items(), locale, origin=origin, rules_version=rules_version)
+                raise
+        else:
+            translated = {source: translate(source) for source in missing}
+        self.put_many(translated.items(), locale, origin=origin, rules_version=rules_version)
+        result.update(translated)
+        return result
+
+    def export(self, locale=None):
+        """All entries (optionally for one locale) as a JSON-serializable dict"""
+        query = 'SELECT locale, source, target, origin, rules_set, rules_version FROM translations'
+        args = ()
+        if locale:
+            query += ' WHERE locale = ?'
+            args = (locale,)
+        query += ' ORDER BY locale, source, origin, rules_set'
+        entries = [dict(zip(('locale', 'source', 'target', 'origin', 'rules_set', 'rules_version'), row))
+                   for row in self.conn.execute(query, args)]
+        return {'version': EXPORT_VERSION, 'entries': entries}
+
+    def import_entries(self, data, origin=None):
+        """Load entries produced by export() in one transaction; returns the number imported"""
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        rows = [(source_hash(entry['source']), entry['locale'], origin or entry.get('origin', 'import'),
+                 rules_set(entry.get('rules_version')), entry['source'], entry['target'],
+                 entry.get('rules_version'), now)
+                for entry in data.get('entries', [])]
+        self._put_rows(rows)
+        return len(rows)
+
+    def seed_from_catalogs(self, source_catalog, target_catalog, locale):
+        """Import translations by aligning two catalogs with the same keys
+
+        For example i18n_categorized.json (source) and
+        i18n_categorized_zh-tw.json (zh-TW): values found under the same key
+        path become source -> target entries.
+        """
+        pairs = {}
+        source_flat = flatten_strings(source_catalog.get('strings', source_catalog))
+        target_flat = flatten_strings(target_catalog.get('strings', target_catalog))
+        for key, source in source_flat.items():
+            target = target_flat.get(key)
+            if target is not None and target != source:
+                pairs[source] = target
+        self.put_many(pairs.items(), locale, origin='import')
+        return len(pairs)
+
+    def stats(self):
+        """Entry counts per (locale, origin, rule set)"""
+        return self.conn.execute(
+            'SELECT locale, origin, rules_set, COUNT(*) FROM translations '
+            'GROUP BY locale, origin, rules_set ORDER BY locale, origin, rules_set'
+        ).fetchall()
+
+
+def collect_strings(obj, result):
+    """Collect every string value of a JSON structure into result"""
+    if isinstance(obj, dict):
+        for value in obj.values():
+            collect_strings(value, result)
+    elif isinstance(obj, list):
+        for item in obj:
+            collect_strings(item, result)
+    elif isinstance(obj, str):
+        result.append(obj)
+    return result
+
+
+def flatten_strings(obj, parent_key=''):
+    """Flatten nested dicts to {'a.b.c': value} for string leaves"""
+    flat = {}
+    for key, value in obj.items():
+        path = f"{parent_key}.{key}" if parent_key else key
+        if isinstance(value, dict):
+            flat.update(flatten_strings(value, path))
+        elif isinstance(value, str):
+            flat[path] = value
+    return flat
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the shared translation memory')
+    parser.add_argument('--db', default=str(DEFAULT_MEMORY_PATH), help='Translation memory file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('stats', help='Show entry counts per locale')
+
+    export_parser = commands.add_parser('export', help='Export entries to JSON')
+    export_parser.add_argument('output')
+    export_parser.add_argument('--locale')
+
+    import_parser = commands.add_parser('import', help='Import entries from an exported JSON file')
+    import_parser.add_argument('input')
+
+    seed_parser = commands.add_parser('seed', help='Seed from a source catalog and its translated copy')
+    seed_parser.add_argument('source', help='e.g. i18n_categorized.json')
+    seed_parser.add_argument('target', help='e.g. i18n_categorized_zh-tw.json')
+    seed_parser.add_argument('--locale', required=True, help='e.g. zh-TW')
+
+    args = parser.parse_args()
+
+    with TranslationMemory(args.db) as memory:
+        if args.command == 'stats':
+            for locale, origin, entry_set, count in memory.stats():
+                print(f"  {locale:8} {origin:8} {entry_set or '-':22} {count:6}")
+        elif args.command == 'export':
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(memory.export(args.locale), f, ensure_ascii=False, indent=2)
+            print(f"✅ Exported to {args.output}")
+        elif args.command == 'import':
+            with open(args.input, 'r', encoding='utf-8') as f:
+                count = memory.import_entries(json.load(f))
+            print(f"✅ Imported {count} entries")
+        elif args.command == 'seed':
+            with open(args.source, 'r', encoding='utf-8') as f:
+                source_catalog = json.load(f)
+            with open(args.target, 'r', encoding='utf-8') as f:
+                target_catalog = json.load(f)
+            count = memory.seed_from_catalogs(source_catalog, target_catalog, args.locale)
+            print(f"✅ Seeded {count} {args.locale} entries")
+
+
+if __name__ == '__main__':
+    main()